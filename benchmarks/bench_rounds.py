@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Round throughput of the four federated algorithms (minibatch_sgd, local_sgd, ACnoisyMB_sgd, ACnoisy_local_sgd)
+of both experiments (dpfl.mnist, dpfl.insurance), on synthetic clients over a grid of (M, Mavail, K, d, n).
+
+For every (script, algorithm, grid point) it reports rounds/sec, per-example gradient evals/sec (Mavail*K per round)
+and the peak memory allocated while the algorithm runs (tracemalloc; the synthetic data itself is not counted), and
+writes them to a JSON file so that runs can be compared against each other.
+
+usage: python benchmarks/bench_rounds.py [--out bench_rounds.json] [--quick] [--M 25 100] [--K 10 100] ...
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dpfl import mnist, insurance
+from dpfl.algorithms import local_sgd, minibatch_sgd, ACnoisyMB_sgd, ACnoisy_local_sgd
+from dpfl.losses import sigmoid, logistic_loss_gradient, squared_loss_gradient, suff_stats
+
+algs = ['MB', 'local', 'noisyMB', 'noisyloc']
+
+
+def synthetic_mnist(M, n, d, rng): #logistic model: [M x n x d] features, 0/1 labels; returns the experiment's oracles
+    w_true = rng.normal(size=d)
+    features = rng.normal(size=(M, n, d)) / np.sqrt(d)
+    labels = (rng.random((M, n)) < sigmoid(features @ w_true)).astype(float)
+    return mnist.make_evals(features, labels)
+
+
+def synthetic_insurance(M, n, d, rng): #linear model with an intercept column, as a (full) client store; returns the experiment's oracles
+    w_true = rng.normal(size=d)
+    X = rng.normal(size=(M, n, d))
+    X[..., 0] = 1
+    Y = X @ w_true + rng.normal(size=(M, n))
+    ns = np.full(M, n)
+    return insurance.make_evals(X, Y, ns, suff_stats(X, Y, ns)[1])
+
+
+def run_alg(script, alg, evals, M, Mavail, K, d, n, R, stepsize, loss_freq, eps, L): #one run, configured as in the script's sweep; returns the algorithm's status
+    f_eval, sample_eval, grad_eval = evals[:3]
+    delta = 1 / n**2
+    if script is mnist: #no clipping
+        loss_gradient, clip, kw = logistic_loss_gradient, False, {}
+        n_MB, delta_MB = n, delta
+    else: #every gradient clipped at L; the noisy MB takes per-client n, delta
+        loss_gradient, clip, kw = squared_loss_gradient, True, dict(diverge_at=insurance.diverge_at)
+        n_MB, delta_MB = np.full(M, n), np.full(M, delta)
+    if alg == 'MB':
+        out = minibatch_sgd(d, M, Mavail, K, R, stepsize, loss_freq, f_eval, grad_eval, L if clip else None, **kw)
+    elif alg == 'local':
+        out = local_sgd(d, M, Mavail, K, R, stepsize, loss_freq, f_eval, sample_eval, loss_gradient, L if clip else None, **kw)
+    elif alg == 'noisyMB':
+        out = ACnoisyMB_sgd(eps, delta_MB, n_MB, L, d, M, Mavail, K, R, stepsize, loss_freq, f_eval, grad_eval, clip=clip, **kw)
+    else:
+        out = ACnoisy_local_sgd(eps, delta, n, L, d, M, Mavail, K, R, stepsize, loss_freq, f_eval, sample_eval, loss_gradient, clip=clip, **kw)
+    return out[2]
+
+
+def bench_point(script, alg, M, Mavail, K, d, n, args): #best-of-repeats timing plus one traced run for the peak memory
+    rng = np.random.default_rng(args.seed)
+    evals = (synthetic_mnist if script is mnist else synthetic_insurance)(M, n, d, rng)
+    params = (M, Mavail, K, d, n, args.R, args.stepsize, args.loss_freq, args.eps, args.L)
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()): #the algorithms print their loss every loss_freq rounds
+        for rep in range(args.repeats):
+            np.random.seed(args.seed + rep)
+            start = time.perf_counter()
+            status = run_alg(script, alg, evals, *params)
+            times.append(time.perf_counter() - start)
+        np.random.seed(args.seed)
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        run_alg(script, alg, evals, *params)
+        peak = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+    seconds = min(times)
+    return dict(script=script.__name__.split('.')[-1], alg=alg, M=M, Mavail=Mavail, K=K, d=d, n=n, R=args.R, status=status,
+                seconds=seconds, rounds_per_s=args.R / seconds, grad_evals_per_s=args.R * Mavail * K / seconds,
+                peak_mem_bytes=peak)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--out', default='bench_rounds.json', help='JSON file the results are written to')
+    parser.add_argument('--M', type=int, nargs='+', default=[25, 100], help='number of clients')
+    parser.add_argument('--Mavail', type=int, nargs='+', default=[5, 12], help='clients per round (points with Mavail > M are skipped)')
+    parser.add_argument('--K', type=int, nargs='+', default=[10, 100], help='local steps / minibatch size')
+    parser.add_argument('--d', type=int, nargs='+', default=[10, 50], help='dimension')
+    parser.add_argument('--n', type=int, nargs='+', default=[100, 1000], help='examples per client')
+    parser.add_argument('--R', type=int, default=20, help='rounds per run')
+    parser.add_argument('--loss-freq', dest='loss_freq', type=int, default=5)
+    parser.add_argument('--stepsize', type=float, default=1e-3)
+    parser.add_argument('--eps', type=float, default=1.)
+    parser.add_argument('--L', type=float, default=10.)
+    parser.add_argument('--repeats', type=int, default=3, help='timed runs per point (the fastest is reported)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scripts', nargs='+', default=['mnist', 'insurance'], choices=['mnist', 'insurance'])
+    parser.add_argument('--algs', nargs='+', default=algs, choices=algs)
+    parser.add_argument('--quick', action='store_true', help='one small grid point (smoke test)')
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.M, args.Mavail, args.K, args.d, args.n, args.repeats = [25], [5], [10], [10], [100], 1
+
+    scripts = {'mnist': mnist, 'insurance': insurance}
+    results = []
+    for name, M, Mavail, K, d, n in itertools.product(args.scripts, args.M, args.Mavail, args.K, args.d, args.n):
+        if Mavail > M:
+            continue
+        for alg in args.algs:
+            res = bench_point(scripts[name], alg, M, Mavail, K, d, n, args)
+            results.append(res)
+            print('{:10s} {:9s} M={:<4d} Mavail={:<4d} K={:<4d} d={:<4d} n={:<5d} {:9.1f} rounds/s {:12.0f} grad evals/s {:8.2f} MiB'.format(
+                name, alg, M, Mavail, K, d, n, res['rounds_per_s'], res['grad_evals_per_s'], res['peak_mem_bytes'] / 2**20))
+
+    meta = dict(time=time.strftime('%Y-%m-%dT%H:%M:%S'), python=platform.python_version(), numpy=np.__version__,
+                platform=platform.platform(), cpu_count=os.cpu_count(),
+                settings={k: v for k, v in vars(args).items() if k not in ('out', 'quick')})
+    with open(args.out + '.tmp', 'w') as f:
+        json.dump(dict(meta=meta, results=results), f, indent=1)
+    os.replace(args.out + '.tmp', args.out)
+    print('wrote {:d} results to {}'.format(len(results), args.out))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+"""
+Locally differentially private federated learning (Lowy & Razaviyayn, "Private Federated Learning Without a Trusted Server:
+Optimal Algorithms for Convex Losses").
+
+The algorithms, noise and reference solvers only need numpy (and scipy for the solvers); the experiments dpfl.mnist and
+dpfl.insurance import their data dependencies (torchvision, sklearn, pandas) and matplotlib only when they need them.
+"""
+
+from .algorithms import local_sgd, minibatch_sgd, ACnoisyMB_sgd, ACnoisy_local_sgd
+from .noise import noise_sd, gauss_AC, client_noise_streams
+from .privacy import sigma, noise_scale, minibatch_size
+from .solvers import least_squares, newton
+
+__all__ = ['local_sgd', 'minibatch_sgd', 'ACnoisyMB_sgd', 'ACnoisy_local_sgd', 'noise_sd', 'gauss_AC', 'client_noise_streams',
+           'sigma', 'noise_scale', 'minibatch_size', 'least_squares', 'newton']
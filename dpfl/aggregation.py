@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Straggler-tolerant aggregation of the local SGD rounds, on a simulated clock: every local job (K local steps of one
+client) takes a latency drawn from a client latency model (see latency_model), and the server
+ - 'sync': waits for all the clients of the round (local_sgd; the round takes as long as its slowest client)
+ - 'first_k': averages the first k of the round's clients to finish and drops the others (the round takes as long as
+   its k-th fastest client; k >= |S| is 'sync')
+ - 'stale': is asynchronous: Mavail jobs are always in flight, each from the model the server had when it started; the
+   server adds every finished job's update (scaled by 1/Mavail) as soon as it arrives, unless more than max_staleness
+   updates were applied since it started (then it is dropped), and starts the next client on the current model.
+   A round is Mavail arrivals. The jobs are those of the clients of R synchronous rounds (drawn round by round, in
+   order) and the last ones drain without new starts, so R rounds cost the same local steps as R synchronous ones.
+The clients and their minibatches come from the schedule (or np.random) exactly as in local_sgd, and the latencies from
+their own stream, so 'sync' runs are exactly the local_sgd runs. Besides the losses, the runs return
+the clock at every loss check, so the wall clock to a target loss (see time_to_loss) can be compared across modes.
+"""
+
+import heapq
+import numpy as np
+from .algorithms import round_sample, local_steps, local_noise, run_rounds
+from .privacy import noise_scale
+
+
+aggregations = ('sync', 'first_k', 'stale')
+
+def latency_model(M, mean=1., jitter=.5, stragglers=.1, slowdown=10., seed=None): #latency(S): the latencies [len(S)] of one local job of each client in S
+    #each job takes mean * lognormal(0, jitter) time units, times slowdown on the stragglers (a fixed random fraction of the M clients)
+    rng = np.random.default_rng(seed)
+    speed = np.where(rng.random(M) < stragglers, slowdown * mean, mean)
+    def latency(S):
+        return speed[S] * rng.lognormal(0, jitter, len(S))
+    return latency
+
+def time_to_loss(clock, losses, target): #the clock at the first loss check with loss <= target (inf if none); clock, losses: [checks] or [runs x checks]
+    clock, losses = np.asarray(clock, dtype=float), np.asarray(losses, dtype=float)
+    hit = losses <= target
+    first = np.argmax(hit, axis=-1)
+    return np.where(hit.any(axis=-1), np.take_along_axis(clock, first[..., None], axis=-1)[..., 0], np.inf)
+
+def sweep_time_to_loss(cells, alg, eps, i, Fstar, target_excess=None): #time_to_loss of the runs of grid point i of (alg, eps) in a sweep's cells, averaged over their reps
+    #(mean clock and excess loss at each check over the reps still running: a diverged rep stops early), to excess loss target_excess
+    #(None: the excess they end at); nan: no cell with a clock
+    runs = [(clock, losses) for job, success, excess, test, losses, seconds, clock, *_ in cells if tuple(job[:3]) == (alg, eps, i) and clock is not None]
+    if not runs:
+        return np.nan
+    checks = max(len(losses) for clock, losses in runs)
+    def padded(trace): #a rep's trace, nan after it stopped
+        return np.concatenate([np.asarray(trace, dtype=float), np.full(checks - len(trace), np.nan)])
+    clock = np.nanmean([padded(clock) for clock, losses in runs], axis=0)
+    excess = np.nanmean([padded(losses) for clock, losses in runs], axis=0) - Fstar
+    return time_to_loss(clock, excess, excess[-1] if target_excess is None else target_excess)
+
+def run_async(x_len, M, Mavail, K, R, stepsize, loss_freq, f_eval, sample_eval, loss_gradient, latency, aggregation='first_k', k=None, max_staleness=None,
+              L=None, noise=None, avg_window=8, diverge_at=100, schedule=None, rounds=None, averaging='window', dtype='float64'):
+    #the loop of async_local_sgd and ACnoisy_async_local_sgd; noise(S) gives the [K x len(S) x d] noise of the jobs of the clients S (None: no noise)
+    #returns run_rounds' (iterates, losses, status) and the clock at each loss check
+    if aggregation not in aggregations:
+        raise ValueError('unknown aggregation {!r} (one of {})'.format(aggregation, ', '.join(aggregations)))
+    schedule = None if schedule is None else iter(schedule)
+    k = None if aggregation == 'sync' else k #None: all the round's clients
+    max_staleness = Mavail if max_staleness is None else max_staleness
+    clock = [0.]
+    def local_iterates(w, S, idxs): #the local iterates of jobs of the clients S started from w
+        features, labels = sample_eval(K, S, idxs)
+        return local_steps(w, features, labels, K, stepsize, loss_gradient, L, None if noise is None else noise(S))
+    def next_iterate_first_k(w):
+        S, idxs = round_sample(M, Mavail, schedule)
+        if len(S) == 0: #no client took part (Poisson sampling)
+            clock.append(clock[-1])
+            return w
+        W = local_iterates(w, S, idxs)
+        seconds = latency(S)
+        first = np.sort(np.argsort(seconds, kind='stable')[:len(S) if k is None else min(k, len(S))]) #the k fastest, in the order of S
+        clock.append(clock[-1] + np.max(seconds[first]))
+        return np.sum(W[first] / len(first), axis=0)
+    in_flight = [] #heap of (finish time, start order, version started from, update)
+    pending = [] #(client, its minibatch indices or None) to start next
+    state = dict(version=0, started=0, drawn=0, now=0.)
+    def start_jobs(w, n_jobs):
+        for _ in range(n_jobs):
+            while not pending and state['drawn'] < (R if rounds is None else rounds): #the next round's clients, in order
+                S, idxs = round_sample(M, Mavail, schedule)
+                state['drawn'] += 1
+                pending.extend(zip(S, [None]*len(S) if idxs is None else idxs))
+            if not pending: #the clients of all the rounds started: let the jobs in flight drain
+                return
+            m, idxs = pending.pop(0)
+            update = local_iterates(w, np.array([m]), None if idxs is None else idxs[None])[0] - w
+            heapq.heappush(in_flight, (state['now'] + latency(np.array([m]))[0], state['started'], state['version'], update))
+            state['started'] += 1
+    def next_iterate_stale(w):
+        w = w.copy()
+        if state['started'] == 0:
+            start_jobs(w, Mavail)
+        for _ in range(Mavail): #one round: Mavail arrivals
+            if not in_flight: #all the jobs arrived
+                break
+            state['now'], _, version, update = heapq.heappop(in_flight)
+            if state['version'] - version <= max_staleness:
+                w += update / Mavail
+                state['version'] += 1
+            start_jobs(w, 1)
+        clock.append(state['now'])
+        return w
+    iterates, losses, status = run_rounds(next_iterate_stale if aggregation == 'stale' else next_iterate_first_k, x_len, R, loss_freq, f_eval,
+                                          avg_window, diverge_at, rounds, averaging, dtype=dtype)
+    return iterates, losses, status, clock[loss_freq::loss_freq][:len(losses)]
+
+def async_local_sgd(x_len, M, Mavail, K, R, stepsize, loss_freq, f_eval, sample_eval, loss_gradient, latency, aggregation='first_k', k=None, max_staleness=None,
+                    L=None, avg_window=8, diverge_at=100, schedule=None, rounds=None, averaging='window', dtype='float64'):
+    #local_sgd with straggler-tolerant aggregation; latency: a latency_model; k: clients averaged per round ('first_k'; default all of them, as 'sync')
+    #max_staleness: updates applied since a job started beyond which it is dropped ('stale', default Mavail); returns (iterates, losses, status, clock)
+    return run_async(x_len, M, Mavail, K, R, stepsize, loss_freq, f_eval, sample_eval, loss_gradient, latency, aggregation, k, max_staleness,
+                     L, None, avg_window, diverge_at, schedule, rounds, averaging, dtype)
+
+def ACnoisy_async_local_sgd(eps, delta, n, L, x_len, M, Mavail, K, R, stepsize, loss_freq, f_eval, sample_eval, loss_gradient, latency, aggregation='first_k', k=None,
+                            max_staleness=None, clip=False, avg_window=8, diverge_at=100, noise_rngs=None, schedule=None, rounds=None, averaging='window', accountant='moments', dtype='float64'):
+    #ACnoisy_local_sgd with straggler-tolerant aggregation (see async_local_sgd); every job's steps get the noise of a noisy local round
+    sd = noise_scale(eps, delta, n, K*R, K, L, accountant)
+    def noise(S):
+        return local_noise(sd, x_len, K, S, noise_rngs, dtype)
+    return run_async(x_len, M, Mavail, K, R, stepsize, loss_freq, f_eval, sample_eval, loss_gradient, latency, aggregation, k, max_staleness,
+                     L if clip else None, noise, avg_window, diverge_at, schedule, rounds, averaging, dtype)
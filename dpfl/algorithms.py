@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The federated algorithms of the experiments: minibatch SGD, local SGD and their noisy (locally differentially private)
+versions ACnoisyMB_sgd and ACnoisy_local_sgd. They only see the data through the oracles of a make_evals (see dpfl.mnist and
+dpfl.insurance), so the same code runs the logistic and the squared loss experiments.
+
+Each algorithm returns (iterates, losses, status): the last avg_window iterates (or, with averaging='ema' or 'polyak',
+their running average; see dpfl.averaging), the loss at their average every loss_freq rounds, and 'converged', or
+'diverged' if a loss exceeded diverge_at or was not finite (which ends the run); rounds=r stops them after the first r of the R rounds
+(see dpfl.tuning) and tracer=... times the phases of every round (see dpfl.tracing). The local SGD algorithms can run
+their rounds on client processes (runtime=..., see dpfl.runtime). dtype='float32' runs the iterates, gradients and noise
+in single precision, given float32 data (see dpfl.precision). The minibatch algorithms clip each client's minibatch grad,
+or, given a per-example gradient oracle (sample_grad_eval=...), every example's grad (per-sample clipping, see clippings).
+compressor=... sends the clients' updates (local SGD) or grads (minibatch SGD) through a compressed uplink and meters its
+bytes per round (see dpfl.compression).
+minibatch_sgd_sweep and ACnoisyMB_sgd_sweep run a whole grid of stepsizes (and clip thresholds) at once.
+
+@author: Andrew Lowy
+"""
+
+import numpy as np
+from .noise import gaussian
+from .privacy import noise_scale
+from .averaging import IterateAverager
+from .tracing import null_tracer
+
+
+clippings = ('none', 'batch', 'sample') #what the minibatch algorithms clip to norm L: nothing (L-Lipschitz losses), each client's MB grad, or each example's grad
+
+def clip_factors(G, L, norms=None): #the factors min(1, L/||g||) that clip each row g of G [... x d] to norm at most L (L broadcasts against G.shape[:-1])
+    #norms: the row norms, if already computed (default np.linalg.norm). The norms of a diverging (float32) run can overflow:
+    #those rows get their factor from the row scaled by its largest |entry| (nan if the row itself is not finite)
+    if norms is None:
+        with np.errstate(over='ignore'):
+            norms = np.linalg.norm(G, axis=-1)
+    c = np.minimum(1, L/norms)
+    big = np.isinf(norms)
+    if big.any():
+        with np.errstate(over='ignore', invalid='ignore'):
+            scale = np.max(np.abs(G[big]), axis=-1)
+            c[big] = np.minimum(1, (np.broadcast_to(L, norms.shape)[big]/scale)/np.linalg.norm(G[big]/scale[:, None], axis=-1))
+    return c
+
+def clipped_gradient(G, L): #per-sample clipping: the mean of the per-example grads G [... x K x d], each clipped to norm at most L (a scalar, or one per leading index of G.shape[:-2])
+    c = clip_factors(G, L if np.ndim(L) == 0 else np.asarray(L)[..., None]) #clip factor of every example (vectorized row norms)
+    return np.matmul(c[..., None, :], G)[..., 0, :] / G.shape[-2] #sum of each batch's clipped grads in one batched matmul
+
+def clip_rows(g, L): #scale each row of g down to norm at most L (row norms via matmul, same rounding as np.linalg.norm of each row)
+    with np.errstate(over='ignore'):
+        norms = np.sqrt(np.matmul(g[:, None, :], g[:, :, None])[:, 0, 0])
+    return g*clip_factors(g, L, norms)[:, None]
+
+def round_sample(M, Mavail, schedule): #this round's clients S and minibatch indices (None: drawn by sample_eval): the next (S, idxs) of a schedule (see dpfl.sampling), if any
+    if schedule is None:
+        #randomly choose Mavail out of the M clients:
+        return np.random.choice(M, size=Mavail, replace=False, p=None), None
+    return next(schedule)
+
+def local_steps(w_start, features, labels, K, stepsize, loss_gradient, L=None, noise=None, tracer=null_tracer): #K steps of local SGD from w_start on each of a stack of clients
+    #features [clients x K x d], labels [clients x K]: the examples of their K single-sample steps; L: clip every local grad to norm L (None: no clipping)
+    #noise: None, or the [K x clients x d] noise added to their grads; returns the clients' local iterates [clients x d]
+    stepsize, L = float(stepsize), None if L is None else float(L) #python floats keep float32 iterates float32 (see dpfl.precision)
+    w = np.tile(w_start, (len(features), 1)) #one row of local iterates per worker, advanced in lockstep
+    for k in range(K): #K steps of local SGD
+        with tracer.phase('gradient'):
+            g = loss_gradient(w, features[:, k:k+1], labels[:, k:k+1]) #[Mavail x d] grads
+        if L is not None:
+            with tracer.phase('clipping'):
+                g = clip_rows(g, L)
+        w -= stepsize * (g if noise is None else g + noise[k]) #one step on every worker
+    return w
+
+def local_sgd_round(w_start, M, Mavail, K, stepsize, sample_eval, loss_gradient, L=None, schedule=None, tracer=null_tracer, compressor=None): #L: clip every local grad to norm L (None: no clipping)
+    with tracer.phase('sampling'):
+        S, idxs = round_sample(M, Mavail, schedule)
+        if len(S) == 0: #no client took part (Poisson sampling)
+            return w_start
+        features, labels = sample_eval(K, S, idxs) #pre-draw the K single-sample steps of every available worker: [Mavail x K x d], [Mavail x K]
+    w = local_steps(w_start, features, labels, K, stepsize, loss_gradient, L, tracer=tracer)
+    w = compress_updates(w, w_start, S, compressor, tracer)
+    with tracer.phase('aggregation'):
+        return np.sum(w / len(S), axis=0) #average SGD updates across the Mavail clients
+
+def compress_updates(W, w_start, S, compressor, tracer=null_tracer): #the local iterates W [len(S) x d] of the clients S as the server gets them: w_start + their decoded updates (compressor None: W)
+    if compressor is None:
+        return W
+    with tracer.phase('compression'):
+        return w_start + compressor.compress(W - w_start, S)
+
+def local_noise(sd, d, K, S, noise_rngs=None, dtype=None): #the noise of a noisy local round of the clients S: [K x len(S) x d]; sd: noise_scale of the run (scalar or per client)
+    if noise_rngs is None:
+        return gaussian(sd if np.ndim(sd) == 0 else sd[S], d, size=(K, len(S)), dtype=dtype)
+    return np.stack([gaussian(sd if np.ndim(sd) == 0 else sd[m], d, size=K, rng=noise_rngs[m], dtype=dtype) for m in S], axis=1) #each worker's noise from its own stream
+
+def noisy_local_sgd_round(w_start, M, Mavail, K, stepsize, sample_eval, loss_gradient, sd, L, clip=False, noise_rngs=None, schedule=None, tracer=null_tracer, compressor=None): #sd: noise scale of each local step (see local_noise); clip: clip every local grad to norm L before adding noise
+    with tracer.phase('sampling'):
+        S, idxs = round_sample(M, Mavail, schedule)
+        if len(S) == 0: #no client took part (Poisson sampling)
+            return w_start
+        features, labels = sample_eval(K, S, idxs) #pre-draw the K single-sample steps of every available worker: [Mavail x K x d], [Mavail x K]
+    with tracer.phase('noise'):
+        noise = local_noise(sd, len(w_start), K, S, noise_rngs, w_start.dtype) #and the noise of the whole round
+    w = local_steps(w_start, features, labels, K, stepsize, loss_gradient, L if clip else None, noise, tracer)
+    w = compress_updates(w, w_start, S, compressor, tracer)
+    with tracer.phase('aggregation'):
+        return np.sum(w / len(S), axis=0) #average SGD updates across the Mavail clients
+
+def run_rounds(next_iterate, x_len, R, loss_freq, f_eval, avg_window=8, diverge_at=100, rounds=None, averaging='window', tracer=null_tracer, dtype='float64', compressor=None): #the loop shared by all algorithms: next_iterate(w) runs one round from w
+    #rounds: stop after the first rounds of the R rounds (the noise stays calibrated for R, so this is a prefix of the full run)
+    #averaging: 'window', 'ema' or 'polyak' (see dpfl.averaging); the returned iterates are the averaged ones, so np.average(iterates, axis=0) is the output
+    #tracer: times the phases of each round (see dpfl.tracing; the default does nothing); dtype: of the iterates (see dpfl.precision)
+    #compressor: the uplink compression of the rounds (see dpfl.compression), whose byte count is closed after every round
+    losses = []
+    averager = IterateAverager(np.zeros(x_len, dtype), averaging, avg_window) #starts from x_len 0's
+    for r in range(R if rounds is None else rounds):
+        tracer.round = r
+        averager.push(next_iterate(averager.last)) #run one round and add it to the average
+        if compressor is not None:
+            compressor.end_round()
+        if (r+1) % loss_freq == 0:
+            with tracer.phase('loss'):
+                losses.append(f_eval(averager.average())) #evalute f (at average of last 8 iterates) every loss_freq rounds
+            print('Iteration: {:d}/{:d}   Loss: {:f}{}                 \r'.format(r+1,R,losses[-1], '' if compressor is None else '   Uplink: {:d} bytes'.format(sum(compressor.round_bytes))), end='')
+            if not np.isfinite(losses[-1]) or losses[-1] > diverge_at: #nan and inf losses diverged too
+                print('\nLoss is diverging: Loss = {:f}'.format(losses[-1]))
+                return averager.iterates(), losses, 'diverged'
+    print('')
+    return averager.iterates(), losses, 'converged'
+
+def local_sgd(x_len, M, Mavail, K, R, stepsize, loss_freq, f_eval, sample_eval, loss_gradient, L=None, avg_window=8, diverge_at=100, schedule=None, rounds=None, averaging='window', runtime=None, tracer=None, dtype='float64', compressor=None):
+    #schedule: the rounds' (S, idxs), e.g. sample_rounds(...) or a replay of one (None: drawn from np.random each round)
+    #runtime: a ClientRuntime (see dpfl.runtime) holding the clients' data: the local steps run on its client processes
+    #tracer: a dpfl.tracing.Tracer to time the phases of every round in (None: no timing)
+    #dtype: 'float64' or 'float32', the compute precision (see dpfl.precision; sample_eval should give data of that dtype)
+    #compressor: a dpfl.compression.Compressor the clients send their updates w_m - w through (None: dense)
+    schedule = None if schedule is None else iter(schedule)
+    tracer = null_tracer if tracer is None else tracer
+    def next_iterate(w):
+        if runtime is not None:
+            with tracer.phase('sampling'):
+                S, idxs = round_sample(M, Mavail, schedule)
+            with tracer.phase('clients'):
+                return runtime.local_round(w, S, idxs, K, stepsize, L, compressor=compressor)
+        return local_sgd_round(w, M, Mavail, K, stepsize, sample_eval, loss_gradient, L, schedule, tracer, compressor)
+    return run_rounds(next_iterate, x_len, R, loss_freq, f_eval, avg_window, diverge_at, rounds, averaging, tracer, dtype, compressor)
+
+def minibatch_sgd(x_len, M, Mavail, K, R, stepsize, loss_freq, f_eval, grad_eval, L=None, avg_window=8, diverge_at=100, schedule=None, rounds=None, averaging='window', tracer=None, dtype='float64', sample_grad_eval=None, compressor=None): #L: clip each client's MB grad to norm L (None: no clipping)
+    #sample_grad_eval: per-example gradient oracle (see make_evals): with it, L clips every example's grad before the MB average instead
+    #compressor: a dpfl.compression.Compressor the clients send their (clipped) MB grads through (None: dense)
+    stepsize, L = float(stepsize), None if L is None else float(L) #python floats keep float32 iterates float32 (see dpfl.precision)
+    per_sample = L is not None and sample_grad_eval is not None
+    schedule = None if schedule is None else iter(schedule)
+    tracer = null_tracer if tracer is None else tracer
+    def next_iterate(w):
+        with tracer.phase('sampling'):
+            S, idxs = round_sample(M, Mavail, schedule)
+        with tracer.phase('gradient'):
+            G = (sample_grad_eval if per_sample else grad_eval)(w, K, S, idxs) #evaluate all Mavail stoch MB grads (per-sample: [Mavail x K x d]) of loss at last iterate in one batched pass
+        if per_sample:
+            with tracer.phase('clipping'):
+                G = clipped_gradient(G, L) #each client's average of its clipped per-example grads
+        elif L is not None:
+            with tracer.phase('clipping'):
+                c = clip_factors(G, L) #clip factors (use bigger threshold since we are clipping sum of K grads)
+        if compressor is not None: #the clients' (clipped) grads as the server decodes them
+            with tracer.phase('compression'):
+                G = compressor.compress(G if L is None or per_sample else G * c[:, None], S)
+        with tracer.phase('aggregation'):
+            g = np.sum(G, axis=0) if L is None or per_sample or compressor is not None else c @ G #sum of (clipped) grads
+            return w - stepsize * g #take SGD step
+    return run_rounds(next_iterate, x_len, R, loss_freq, f_eval, avg_window, diverge_at, rounds, averaging, tracer, dtype, compressor)
+
+def ACnoisyMB_sgd(eps, delta, n, L, x_len, M, Mavail, K, R, stepsize, loss_freq, f_eval, grad_eval, clip=False, avg_window=8, diverge_at=100, noise_rngs=None, schedule=None, rounds=None, averaging='window', accountant='moments', tracer=None, dtype='float64', sample_grad_eval=None, compressor=None):
+    #n, delta: scalars, or arrays with the local train set size (and delta) of each client; clip: clip each client's MB grad to norm L
+    #(given sample_grad_eval, as in minibatch_sgd: every example's grad); accountant: privacy accounting of the noise (see dpfl.privacy)
+    #compressor: as in minibatch_sgd, on the noisy grads
+    stepsize, L = float(stepsize), float(L)
+    per_sample = clip and sample_grad_eval is not None
+    sd = noise_scale(eps, delta, n, R, K, L, accountant) #once per run: scalar, or per client
+    per_client = np.ndim(sd) > 0
+    schedule = None if schedule is None else iter(schedule)
+    tracer = null_tracer if tracer is None else tracer
+    def next_iterate(w):
+        with tracer.phase('sampling'):
+            S, idxs = round_sample(M, Mavail, schedule)
+        with tracer.phase('gradient'):
+            G = (sample_grad_eval if per_sample else grad_eval)(w, K, S, idxs) #all Mavail stoch MB grads (per-sample: [Mavail x K x d]) in one batched pass
+        with tracer.phase('noise'):
+            if noise_rngs is None: #one noise draw per client
+                noise = gaussian(sd[S] if per_client else sd, x_len, size=len(S), dtype=w.dtype)
+            else: #each client's noise from its own stream
+                noise = np.stack([gaussian(sd[m] if per_client else sd, x_len, rng=noise_rngs[m], dtype=w.dtype) for m in S])
+        if per_sample:
+            with tracer.phase('clipping'):
+                G = clipped_gradient(G, L) #each client's average of its clipped per-example grads
+        elif clip:
+            with tracer.phase('clipping'):
+                c = clip_factors(G, L)
+        if compressor is not None: #the clients' noisy (clipped) grads as the server decodes them
+            with tracer.phase('compression'):
+                G = compressor.compress((G * c[:, None] if clip and not per_sample else G) + noise, S)
+            with tracer.phase('aggregation'):
+                g = np.sum(G, axis=0)
+        elif clip and not per_sample:
+            with tracer.phase('aggregation'):
+                g = c @ G + np.sum(noise, axis=0) #sum of clipped grads plus noise
+        else:
+            with tracer.phase('aggregation'):
+                g = np.sum(G + noise, axis=0)
+        with tracer.phase('aggregation'):
+            return w - stepsize * g #take SGD step
+    return run_rounds(next_iterate, x_len, R, loss_freq, f_eval, avg_window, diverge_at, rounds, averaging, tracer, dtype, compressor)
+
+def ACnoisy_local_sgd(eps, delta, n, L, x_len, M, Mavail, K, R, stepsize, loss_freq, f_eval, sample_eval, loss_gradient, clip=False, avg_window=8, diverge_at=100, noise_rngs=None, schedule=None, rounds=None, averaging='window', runtime=None, accountant='moments', tracer=None, dtype='float64', compressor=None): #LDP (not CDP) variant of McMahon et al 2018
+    #runtime: as in local_sgd; the noise is then drawn on the clients, from their own streams (noise_rngs is not used)
+    schedule = None if schedule is None else iter(schedule)
+    tracer = null_tracer if tracer is None else tracer
+    sd = noise_scale(eps, delta, n, K*R, K, L, accountant) #once per run (K*R noisy steps): scalar, or per client
+    def next_iterate(w):
+        if runtime is not None:
+            with tracer.phase('sampling'):
+                S, idxs = round_sample(M, Mavail, schedule)
+            with tracer.phase('clients'):
+                return runtime.local_round(w, S, idxs, K, stepsize, L if clip else None, sd, compressor)
+        return noisy_local_sgd_round(w, M, Mavail, K, stepsize, sample_eval, loss_gradient, sd, L, clip, noise_rngs, schedule, tracer, compressor) #local sgd round + noise
+    return run_rounds(next_iterate, x_len, R, loss_freq, f_eval, avg_window, diverge_at, rounds, averaging, tracer, dtype, compressor)
+
+###Sweep mode: a whole tuning grid of the minibatch algorithms as one stacked run###
+#Each config (a stepsize, clip threshold L and rep) has its own iterate, client subsets, minibatches and noise, exactly as a separate
+#run would, but all configs advance together: one round is one batched gradient evaluation over a [configs x Mavail x K x d] minibatch.
+#A config whose loss exceeds diverge_at (or is not finite) is frozen (masked out of later rounds) instead of ending the run.
+sweep_chunk_bytes = 2**24 #memory budget of one round's minibatch features; bigger grids run in chunks of configs
+
+def sample_clients(n_configs, M, Mavail): #an independent uniformly random Mavail-subset of the M clients for each config: [n_configs x Mavail]
+    return np.argsort(np.random.random((n_configs, M)), axis=1)[:, :Mavail]
+
+def run_rounds_stacked(next_iterates, x_len, n_configs, R, loss_freq, f_eval, avg_window=8, diverge_at=100, averaging='window', dtype='float64'):
+    #run_rounds for a stack of configs: next_iterates(W, active) runs one round from the [len(active) x d] iterates W of the configs active
+    #returns (average of each config's iterates (its last avg_window, with averaging='window') [n_configs x d], losses [n_configs x R//loss_freq] (nan once diverged), diverged [n_configs])
+    losses = np.full((n_configs, R // loss_freq), np.nan)
+    diverged = np.zeros(n_configs, dtype=bool)
+    averager = IterateAverager(np.zeros((n_configs, x_len), dtype), averaging, avg_window)
+    for r in range(R):
+        active = np.flatnonzero(~diverged)
+        W = averager.last.copy() #diverged configs keep their last iterate
+        W[active] = next_iterates(averager.last[active], active)
+        averager.push(W)
+        if (r+1) % loss_freq == 0:
+            avg = averager.average()
+            check = (r+1) // loss_freq - 1
+            losses[active, check] = [f_eval(w) for w in avg[active]] #evalute f (at average of last 8 iterates) of every active config
+            diverged[active] = ~np.isfinite(losses[active, check]) | (losses[active, check] > diverge_at)
+            print('Iteration: {:d}/{:d}   Best loss: {:f}   Diverged: {:d}/{:d}                 \r'.format(r+1, R, np.nanmin(losses[:, check]), np.sum(diverged), n_configs), end='')
+            if diverged.all():
+                break
+    print('')
+    return averager.average().copy(), losses, diverged
+
+def in_chunks(run_chunk, n_configs, chunk_size): #run_chunk(configs) on consecutive chunks of the config indices and concatenate its outputs
+    parts = [run_chunk(np.arange(start, min(start + chunk_size, n_configs))) for start in range(0, n_configs, chunk_size)]
+    return tuple(np.concatenate(outs) for outs in zip(*parts))
+
+def minibatch_sgd_sweep(x_len, M, Mavail, K, R, stepsizes, loss_freq, f_eval, grad_eval, L=None, avg_window=8, diverge_at=100, chunk_size=None, averaging='window', dtype='float64', sample_grad_eval=None):
+    #minibatch_sgd for every config: stepsizes [n_configs], L None or a clip threshold (scalar or one per config); see run_rounds_stacked for the outputs
+    #sample_grad_eval: per-sample clipping, as in minibatch_sgd
+    stepsizes = np.asarray(stepsizes, dtype=dtype)
+    n_configs = len(stepsizes)
+    L = None if L is None else np.broadcast_to(np.asarray(L, dtype=dtype), (n_configs,))
+    def run_chunk(configs):
+        def next_iterates(W, active):
+            S = sample_clients(len(active), M, Mavail)
+            if L is not None and sample_grad_eval is not None: #per-sample clipping: each client's average clipped grad
+                G = clipped_gradient(sample_grad_eval(W[:, None, :], K, S), L[configs[active], None])
+            else:
+                G = grad_eval(W[:, None, :], K, S) #all configs' Mavail stoch MB grads in one batched pass: [configs x Mavail x d]
+            if L is None or sample_grad_eval is not None:
+                g = np.sum(G, axis=1)
+            else: #clip each client's MB grad
+                c = clip_factors(G, L[configs[active], None])
+                g = np.matmul(c[:, None, :], G)[:, 0, :]
+            return W - stepsizes[configs[active], None] * g
+        return run_rounds_stacked(next_iterates, x_len, len(configs), R, loss_freq, f_eval, avg_window, diverge_at, averaging, dtype)
+    chunk_size = chunk_size or max(1, sweep_chunk_bytes // (np.dtype(dtype).itemsize*Mavail*K*x_len))
+    return in_chunks(run_chunk, n_configs, chunk_size)
+
+def ACnoisyMB_sgd_sweep(eps, delta, n, L, x_len, M, Mavail, K, R, stepsizes, loss_freq, f_eval, grad_eval, clip=False, avg_window=8, diverge_at=100, chunk_size=None, averaging='window', accountant='moments', dtype='float64', sample_grad_eval=None):
+    #ACnoisyMB_sgd for every config: stepsizes [n_configs], L a scalar or one per config; n, delta and sample_grad_eval as in ACnoisyMB_sgd
+    stepsizes = np.asarray(stepsizes, dtype=dtype)
+    n_configs = len(stepsizes)
+    sd = np.array([np.broadcast_to(noise_scale(eps, delta, n, R, K, L_c, accountant), (M,)) for L_c in np.broadcast_to(np.asarray(L, dtype=float), (n_configs,))]) #noise std dev of each (config, client)
+    L = np.broadcast_to(np.asarray(L, dtype=dtype), (n_configs,))
+    def run_chunk(configs):
+        def next_iterates(W, active):
+            S = sample_clients(len(active), M, Mavail)
+            if clip and sample_grad_eval is not None: #per-sample clipping: each client's average clipped grad
+                G = clipped_gradient(sample_grad_eval(W[:, None, :], K, S), L[configs[active], None])
+            else:
+                G = grad_eval(W[:, None, :], K, S) #all configs' Mavail stoch MB grads in one batched pass: [configs x Mavail x d]
+            noise = (sd[configs[active][:, None], S][..., None] * np.random.standard_normal(G.shape)).astype(dtype, copy=False) #one noise draw per (config, client)
+            if clip and sample_grad_eval is None:
+                c = clip_factors(G, L[configs[active], None])
+                g = np.matmul(c[:, None, :], G)[:, 0, :] + np.sum(noise, axis=1) #sum of clipped grads plus noise
+            else:
+                g = np.sum(G + noise, axis=1)
+            return W - stepsizes[configs[active], None] * g
+        return run_rounds_stacked(next_iterates, x_len, len(configs), R, loss_freq, f_eval, avg_window, diverge_at, averaging, dtype)
+    chunk_size = chunk_size or max(1, sweep_chunk_bytes // (np.dtype(dtype).itemsize*Mavail*K*x_len))
+    return in_chunks(run_chunk, n_configs, chunk_size)
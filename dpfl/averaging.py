@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Iterate averaging of the training loops: the losses (and the final test errors) are evaluated at an average of the
+iterates rather than at the last one. The averager keeps it in preallocated storage, O(d) per round:
+ - 'window' (default): mean of the last avg_window iterates (including the initial 0 while there are fewer), a ring
+   buffer with a running sum (recomputed from the buffer once per wrap, so rounding does not build up)
+ - 'ema': exponential moving average with weight 1 - 2/(avg_window+1) on the past (span avg_window)
+ - 'polyak': mean of all iterates so far
+"""
+
+import numpy as np
+
+
+averaging_modes = ('window', 'ema', 'polyak')
+
+class IterateAverager:
+    def __init__(self, w0, mode='window', avg_window=8): #w0: initial iterate (a vector, or a stack of them)
+        if mode not in averaging_modes:
+            raise ValueError('unknown averaging {!r} (one of {})'.format(mode, ', '.join(averaging_modes)))
+        self.mode = mode
+        self.buffer = np.zeros((avg_window if mode == 'window' else 1,) + np.shape(w0), dtype=np.asarray(w0).dtype) #window: ring buffer; else just the last iterate (in the dtype of w0)
+        self.buffer[0] = w0
+        self.pos = 0 #slot of the last iterate
+        self.count = 1 #iterates averaged over
+        self.total = self.buffer[0].copy() #window, polyak: their sum; ema: the average itself
+        self.scratch = np.empty_like(self.total)
+        self.decay = 1 - 2/(avg_window + 1)
+
+    @property
+    def last(self): #the last iterate (a view: do not modify)
+        return self.buffer[self.pos]
+
+    def push(self, w): #add the next iterate
+        if self.mode == 'window':
+            self.pos = (self.pos + 1) % len(self.buffer)
+            if self.count == len(self.buffer):
+                self.total -= self.buffer[self.pos] #evict the oldest
+            else:
+                self.count += 1
+            self.buffer[self.pos] = w
+            if self.pos == 0 and self.count == len(self.buffer): #once per wrap: exact sum of the buffer
+                np.sum(self.buffer, axis=0, out=self.total)
+            else:
+                self.total += self.buffer[self.pos]
+        else:
+            self.buffer[0] = w
+            self.count += 1
+            if self.mode == 'polyak':
+                self.total += self.buffer[0]
+            else:
+                np.subtract(self.buffer[0], self.total, out=self.scratch)
+                self.scratch *= 1 - self.decay
+                self.total += self.scratch
+
+    def average(self): #the current average (internal storage, overwritten by the next call: copy it to keep it)
+        if self.mode == 'ema':
+            return self.total
+        return np.divide(self.total, self.count, out=self.scratch)
+
+    def iterates(self): #iterates whose mean is the average, oldest first: the window, or (ema, polyak) the average itself
+        if self.mode == 'window':
+            return [self.buffer[(self.pos - k) % len(self.buffer)].copy() for k in reversed(range(self.count))]
+        return [self.average().copy()]
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Checkpoints of the hyperparameter sweep: every finished sweep job is appended, as one JSON line with its cells, to the
+checkpoint file of its trial as soon as it comes back, so an experiment that is interrupted and rerun with the same
+configuration skips the jobs it already did (see dpfl.sweep.run_sweep). The data splits of a trial only depend on the
+experiment's base seed, so a resumed trial sees the same data as the interrupted one.
+
+A checkpoint folder holds config.json (the configuration it belongs to) and one trial<t>.jsonl per trial. Each line is
+written with a single append and fsync'd; a torn last line (a crash mid-write) is dropped when loading.
+"""
+
+import hashlib
+import json
+import os
+
+
+def checkpoint_folder(root, name, config): #the checkpoint folder of an experiment configuration (a json-able dict): root/name_<hash of config>
+    text = json.dumps(config, sort_keys=True)
+    folder = os.path.join(root, '{}_{}'.format(name, hashlib.sha1(text.encode()).hexdigest()[:12]))
+    os.makedirs(folder, exist_ok=True)
+    fname = os.path.join(folder, 'config.json')
+    if not os.path.exists(fname):
+        with open(fname + '.tmp', 'w') as f:
+            f.write(text)
+        os.replace(fname + '.tmp', fname)
+    return folder
+
+def trial_file(folder, trial, rounds=None): #checkpoint file of one trial (rounds: of its successive halving rung of that many rounds)
+    return os.path.join(folder, 'trial{:03d}.jsonl'.format(trial) if rounds is None else 'trial{:03d}_rounds{:d}.jsonl'.format(trial, rounds))
+
+def job_key(job): #jobs are identified by their json text (floats round-trip exactly)
+    return json.dumps(job)
+
+def as_tuples(x): #json lists back to the tuples the sweep uses for jobs and cells
+    return tuple(as_tuples(v) for v in x) if isinstance(x, list) else x
+
+def load_cells(fname): #{job key: cell or list of cells (stacked job)} of the jobs finished in a checkpoint file
+    done = {}
+    if not os.path.exists(fname):
+        return done
+    with open(fname, 'rb') as f:
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    if end < len(data): #drop a torn last line, so the next append starts on a fresh line
+        os.truncate(fname, end)
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError: #not a record we wrote; its job is run again
+            continue
+        out = record['out']
+        done[record['job']] = [as_tuples(cell) for cell in out] if record['stacked'] else as_tuples(out)
+    return done
+
+def append_cells(fname, job, out): #append one finished job (out: its cell, or list of cells) to a checkpoint file
+    line = json.dumps(dict(job=job_key(job), stacked=isinstance(out, list), out=out), default=float) + '\n' #default: numpy scalars
+    fd = os.open(fname, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode())
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,87 @@
+"""
+Command line entry point: `dpfl mnist ...` / `dpfl insurance ...` (or `python -m dpfl ...`) runs an experiment with the
+paper's parameters unless overridden, writes its results table (path + "results.npz", see dpfl.results) and plots it;
+`dpfl plot <results.npz>` redraws the plots of a saved results table.
+"""
+
+import argparse
+from .sampling import client_samplings, minibatch_samplings
+from .results import save_results, load_results
+from .averaging import averaging_modes
+from .aggregation import aggregations
+from .privacy import accountants
+from .precision import dtypes
+from .algorithms import clippings
+from .compression import compressions
+
+
+def experiment_module(name): #dpfl.mnist or dpfl.insurance (imported on demand)
+    if name == 'mnist':
+        from . import mnist
+        return mnist
+    from . import insurance
+    return insurance
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='dpfl', description='Locally differentially private federated learning experiments')
+    sub = parser.add_subparsers(dest='experiment', required=True)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--num-trials', type=int, help='number of trials (new train/test splits)')
+    common.add_argument('--n-reps', type=int, help='runs per grid point and trial')
+    common.add_argument('--n-stepsizes', type=int, help='number of stepsizes in the tuning grid')
+    common.add_argument('--R', type=int, help='number of rounds')
+    common.add_argument('--Mavail', type=int, help='clients per round')
+    common.add_argument('--loss-freq', type=int, help='rounds between loss evaluations')
+    common.add_argument('--epsilons', type=float, nargs='+', help='privacy levels to sweep')
+    common.add_argument('--workers', dest='n_workers', type=int, help='processes for the sweep (default: one per cpu; 1 = no pool)')
+    common.add_argument('--stacked', action='store_true', default=None, help='sweep mode: run each (noisy) MB SGD tuning grid as one stacked run')
+    common.add_argument('--client-sampling', choices=client_samplings, help='pre-drawn round schedules: how the clients of a round are sampled')
+    common.add_argument('--minibatch-sampling', choices=minibatch_samplings, help='pre-drawn round schedules: how minibatch indices are sampled')
+    common.add_argument('--checkpoint-dir', help='save finished sweep jobs here and resume an interrupted run of the same configuration')
+    common.add_argument('--tuner', choices=['grid', 'halving'], help='run the whole tuning grid (default) or prune it by successive halving')
+    common.add_argument('--eta', type=int, help='successive halving: keep the best 1/eta of the grid at each rung (default 3)')
+    common.add_argument('--averaging', choices=averaging_modes, help='iterate averaging of the runs (default: window of the last 8)')
+    common.add_argument('--federated', action='store_true', default=None, help='run the local SGD rounds on one worker process per client')
+    common.add_argument('--aggregation', choices=aggregations, help='run local SGD with this aggregation on a simulated clock with stragglers')
+    common.add_argument('--first-k', type=int, help='first_k aggregation: average the first k clients of each round (default all)')
+    common.add_argument('--max-staleness', type=int, help='stale aggregation: drop updates more than this many updates old (default Mavail)')
+    common.add_argument('--stragglers', type=float, help='fraction of the clients that are stragglers (default 0.1)')
+    common.add_argument('--slowdown', type=float, help='how many times slower the stragglers are (default 10)')
+    common.add_argument('--target-excess', type=float, help='aggregation: report the simulated time of the tuned local SGD runs to reach train loss Fstar + this (default: their final loss)')
+    common.add_argument('--accountant', choices=accountants, help='privacy accounting of K and the noise: moments account (default) or advanced composition')
+    common.add_argument('--trace-dir', help='time the phases of every run and write a Chrome trace of each trial to this folder')
+    common.add_argument('--dtype', choices=dtypes, help='compute precision of the runs: float64 (default) or float32 data, iterates, grads and noise')
+    common.add_argument('--clipping', choices=clippings, help='what (noisy) MB SGD clips to norm L: nothing (mnist default), each client\'s MB grad (insurance default) or each example\'s grad')
+    common.add_argument('--compression', choices=compressions, help='compress the clients\' uplink messages (synchronous runs) and record the bytes sent')
+    common.add_argument('--compression-ratio', type=float, help='topk, rotation: fraction of the coordinates each client sends (default 0.1)')
+    common.add_argument('--no-plot', action='store_true', help='skip the plots')
+
+    mnist = sub.add_parser('mnist', parents=[common], help='logistic regression on MNIST (even vs. odd)')
+    mnist.add_argument('--p', type=float, help='fraction of each client\'s data drawn from all digits (0: fully heterogeneous)')
+    mnist.add_argument('--dim', type=int, help='PCA dimension')
+    mnist.add_argument('--data-path', help='folder (in data) of the preprocessing cache')
+
+    insurance = sub.add_parser('insurance', parents=[common], help='linear regression on the insurance data')
+    insurance.add_argument('--N', type=int, help='number of clients')
+    insurance.add_argument('--csv', help='path of insurance.csv')
+    insurance.add_argument('--Ls', type=float, nargs='+', help='clip thresholds to sweep')
+
+    plot = sub.add_parser('plot', help='redraw the plots of a saved results table')
+    plot.add_argument('results', help='results .npz written by an experiment')
+
+    args = parser.parse_args(argv)
+    if args.experiment == 'plot':
+        res = load_results(args.results)
+        experiment_module(res['experiment']).plot_results(res)
+        return res
+    kwargs = {k: v for k, v in vars(args).items() if v is not None and k not in ('experiment', 'no_plot')}
+    experiment = experiment_module(args.experiment)
+    res = experiment.experiment(**kwargs)
+    save_results(res)
+    if not args.no_plot:
+        experiment.plot_results(res)
+    return res
+
+
+if __name__ == '__main__':
+    main()
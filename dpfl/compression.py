@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compression of the client -> server uplink: every round each client of S sends one message, its update w_m - w_start
+(local SGD) or its (clipped, noisy) minibatch grad (minibatch SGD), and the server aggregates what it decodes. The
+algorithms take a Compressor (compressor=..., see dpfl.algorithms), which encodes and decodes the messages of a round
+and meters the bytes sent:
+ - 'topk': each client sends its k = ratio * d largest coordinates (values and int32 indices) and keeps the rest in an
+   error feedback memory that is added to its next message
+ - 'quantize': stochastic 8-bit quantization, each coordinate rounded at random (unbiasedly) to one of 255 levels
+   between -max|u| and max|u| (one int8 per coordinate plus a float32 scale)
+ - 'rotation': random rotation sketch, the message is rotated by a random orthogonal matrix and the client sends k
+   random coordinates of it (scaled by d/k, so unbiased); the rotation and coordinates come from a seed shared with the
+   server and are not sent
+The privacy noise is added before compression (it is post-processing of the LDP messages). The compressor draws from
+its own stream, so the clients, minibatches and noise of a run are those of the uncompressed run.
+"""
+
+import numpy as np
+
+
+compressions = ('topk', 'quantize', 'rotation')
+
+class Compressor:
+    #mode: one of compressions; d: message length; M: number of clients (for the error feedback memory of 'topk')
+    #ratio: fraction of the d coordinates sent ('topk', 'rotation'); seed: of the compressor's stream (quantization, rotations)
+    def __init__(self, mode, d, M, ratio=.1, seed=None):
+        if mode not in compressions:
+            raise ValueError('unknown compression {!r} (one of {})'.format(mode, ', '.join(compressions)))
+        self.mode, self.d, self.M = mode, d, M
+        self.k = min(d, max(1, int(round(ratio*d))))
+        self.rng = np.random.default_rng(seed)
+        self.residual = None #'topk': the error feedback memory of every client [M x d]
+        self.sent = self.dense = 0 #bytes sent in the current round (and what they take uncompressed)
+        self.round_bytes = [] #bytes sent in each round (all clients)
+        self.dense_bytes = [] #bytes the same messages take uncompressed
+
+    def message_bytes(self, itemsize): #size of one client's message
+        if self.mode == 'topk':
+            return self.k * (4 + itemsize)
+        if self.mode == 'quantize':
+            return self.d + 4
+        return self.k * itemsize
+
+    def compress(self, U, S): #the messages U [len(S) x d] of the clients S as the server decodes them
+        if self.mode == 'topk':
+            if self.residual is None:
+                self.residual = np.zeros((self.M, self.d), dtype=U.dtype)
+            first = np.zeros(len(S), dtype=bool) #the first message of each client (S may repeat clients)
+            first[np.unique(S, return_index=True)[1]] = True
+            V = U + np.where(first[:, None], self.residual[S], 0) #add what was not sent before, once per client
+            top = np.argpartition(np.abs(V), self.d - self.k, axis=1)[:, self.d - self.k:] #the k largest coordinates of each row
+            decoded = np.zeros_like(V)
+            np.put_along_axis(decoded, top, np.take_along_axis(V, top, axis=1), axis=1)
+            self.residual[S] = 0
+            np.add.at(self.residual, S, V - decoded) #what none of a client's messages sent
+        elif self.mode == 'quantize':
+            scale = np.max(np.abs(U), axis=1, keepdims=True)
+            scale = np.where(scale > 0, scale, 1) / 127
+            levels = np.floor(np.abs(U) / scale + self.rng.random(U.shape)) #stochastic rounding: unbiased
+            decoded = np.sign(U) * levels * scale
+        else:
+            Q = np.linalg.qr(self.rng.standard_normal((self.d, self.d)))[0] #shared random rotation of this round
+            kept = np.argsort(self.rng.random((len(S), self.d)), axis=1)[:, :self.k] #shared random coordinates of each client
+            rotated = U @ Q.T
+            sketch = np.zeros_like(rotated)
+            np.put_along_axis(sketch, kept, np.take_along_axis(rotated, kept, axis=1) * (self.d / self.k), axis=1)
+            decoded = sketch @ Q
+        self.sent += len(S) * self.message_bytes(U.dtype.itemsize)
+        self.dense += len(S) * self.d * U.dtype.itemsize
+        return decoded.astype(U.dtype, copy=False)
+
+    def end_round(self): #close the byte count of a round (called by the training loop after every round, see run_rounds)
+        self.round_bytes.append(self.sent)
+        self.dense_bytes.append(self.dense)
+        self.sent = self.dense = 0
+
+    def uplink(self, loss_freq): #total bytes sent up to each loss check
+        return np.cumsum(self.round_bytes)[loss_freq-1::loss_freq]
+
+    def summary(self): #bytes per round, compressed and dense
+        if not self.round_bytes:
+            return 'no rounds run'
+        sent, dense = np.sum(self.round_bytes), np.sum(self.dense_bytes)
+        return '{}: {:.0f} bytes/round uplink ({:.1f}x less than dense)'.format(self.mode, sent / len(self.round_bytes), dense / max(1, sent))
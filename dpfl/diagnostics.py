@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Diagnostics of a train split, computed once per trial after the reference solve (newton / least_squares), each in one
+batched pass over the client store (features [M x n_max x d], labels [M x n_max], ns examples per client; padding rows
+are zero and do not count):
+ - max_row_norm: the largest feature norm over all clients (L = 2 max ||x|| bounds the logistic loss' Lipschitz constant)
+ - client_gradient_norms: ||grad F_m(w)|| of every client m at w (e.g. wstar)
+ - upsilon^2 = mean over clients of ||grad F_m(wstar)||^2, the heterogeneity of the split
+split_diagnostics returns all three.
+"""
+
+import numpy as np
+
+
+def max_row_norm(features): #max over all clients and examples of ||x|| (the padding rows are 0)
+    return np.sqrt(np.max(np.einsum('...i,...i->...', features, features)))
+
+def client_gradient_norms(w, features, labels, loss_gradient, ns=None): #[M] norms of the full gradient of each client's loss at w; ns: examples of each client (scalar or [M], default n_max)
+    #loss_gradient averages over n_max rows per client (the zero padding rows have zero gradient), rescaled to the client's own ns
+    n_max = features.shape[1]
+    ns = np.broadcast_to(np.asarray(n_max if ns is None else ns, dtype=float), (features.shape[0],))
+    G = loss_gradient(w, features, labels) * (n_max / ns)[:, None] #[M x d], all clients in one batched matmul
+    return np.linalg.norm(G, axis=1)
+
+def split_diagnostics(features, labels, wstar, loss_gradient, ns=None): #dict(L, grad_norms, upsilon) of a split (see the module docstring)
+    grad_norms = client_gradient_norms(wstar, features, labels, loss_gradient, ns)
+    return dict(L=2*max_row_norm(features), grad_norms=grad_norms, upsilon=np.mean(grad_norms**2))
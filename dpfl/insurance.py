@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Linear regression experiment on the medical insurance data (insurance.csv): N clients, split by sorted charges.
+
+pandas and sklearn are only imported to load and split the data, and matplotlib only when plotting.
+
+@author: Andrew Lowy
+"""
+
+import os
+import itertools
+import time
+from functools import partial
+import numpy as np
+from .losses import squared_loss_gradient, squared_loss_sample_gradients, client_store, suff_stats, stats_loss, stats_gradient, stats_hessian
+from .algorithms import local_sgd, minibatch_sgd, ACnoisyMB_sgd, ACnoisy_local_sgd, minibatch_sgd_sweep, ACnoisyMB_sgd_sweep
+from .solvers import least_squares
+from .sweep import sweep_algs, cell_seed, tune_sweep, reduce_sweep, check_options, job_setup, job_outputs
+from .checkpoint import checkpoint_folder, trial_file
+from .results import run_table, concat_tables
+from .runtime import ClientRuntime
+from .aggregation import async_local_sgd, ACnoisy_async_local_sgd, sweep_time_to_loss
+from .privacy import minibatch_size
+from .tracing import merge_job_traces
+from .precision import as_compute
+
+
+base_seed = 2022 #all randomness (data splits and the per-job seeds of the sweep) derives from this
+
+def load_insurance(fname='insurance.csv'): #reads the insurance data and label-encodes its categorical columns (sex, smoker, region)
+    import pandas as pd
+    from sklearn.preprocessing import LabelEncoder
+    df = pd.read_csv(fname)
+    #df.describe()
+    #sex
+    le = LabelEncoder()
+    le.fit(df.sex.drop_duplicates())
+    df.sex = le.transform(df.sex)
+    # smoker or not
+    le.fit(df.smoker.drop_duplicates())
+    df.smoker = le.transform(df.smoker)
+    #region
+    le.fit(df.region.drop_duplicates())
+    df.region = le.transform(df.region)
+    return df
+
+def clientsplit(df, N): #(almost) balanced split
+    dfs = [] #will store N dataframes (X_1, Y_1), ... (X_N, Y_N)
+    n = int(np.ceil(len(df['charges'])/N))
+    Ys = df['charges'].sort_values(ascending=True)
+    indices = list(Ys.index)
+    sorted_df = df.iloc[indices, ::]
+    for i in range(N):
+        dfs.append(sorted_df[i*n:(i+1)*n])
+    return dfs
+
+def feat_lab_by_mach(df, N): #returns 2 lists (each contains N dataframes): (non-standardized) features_by_machine, labels_by_machine
+    features_by_machine = [] #just a helper fxn for splitdata - features are not standardized yet!
+    labels_by_machine = []
+    dfs = clientsplit(df, N)
+    for i in range(N):
+        X = dfs[i].iloc[::, 0:6]
+        X.insert(0, 'const', 1)
+        Y = dfs[i].iloc[::, 6]
+        features_by_machine.append(X)
+        labels_by_machine.append(Y)
+    return features_by_machine, labels_by_machine
+
+
+def splitdata(df, N): #returns 4 arrays (each contains N dataframes): (standardized) train_features_by_machine, train_labels_by_machine, (standardized) test_...
+    from sklearn.model_selection import train_test_split
+    train_features_by_machine = []
+    train_labels_by_machine = []
+    test_features_by_machine = []
+    test_labels_by_machine = []
+    features_by_machine, labels_by_machine = feat_lab_by_mach(df, N)
+    for i in range(N):
+        X, Y = feat_lab_by_mach(df, N)
+        X_train, X_test, y_train, y_test = train_test_split(X[i], Y[i], test_size=0.20)
+        standardized_Xtrain_cols = (X_train.iloc[::, 1:4:2] - X_train.iloc[::, 1:4:2].mean())/X_train.iloc[::, 1:4:2].std()
+        standardized_Xtest_cols = (X_test.iloc[::, 1:4:2] - X_train.iloc[::, 1:4:2].mean())/X_train.iloc[::, 1:4:2].std()
+        X_test = X_test.assign(age =standardized_Xtest_cols['age'])
+        X_test = X_test.assign(bmi =standardized_Xtest_cols['bmi'])
+        X_train = X_train.assign(age =standardized_Xtrain_cols['age'])
+        X_train = X_train.assign(bmi =standardized_Xtrain_cols['bmi'])
+        train_features_by_machine.append(X_train)
+        test_features_by_machine.append(X_test)
+        train_labels_by_machine.append(y_train)
+        test_labels_by_machine.append(y_test)
+    return train_features_by_machine, train_labels_by_machine, test_features_by_machine, test_labels_by_machine
+
+##################################################################################################################
+
+def make_evals(train_X, train_Y, train_ns, train_stats): #returns the loss/gradient oracles of one train split (a client store, see client_store, and its summed suff_stats): f_eval, sample_eval, grad_eval, full_grad_eval, hessian_eval, sample_grad_eval
+    def f_eval(w):
+        return stats_loss(w, train_stats)
+
+    def sample_eval(minibatch_size, m, idxs=None): #draw minibatch (unif w/replacement) of size minibatch_size from machine m's dataset, or take the given idxs (see dpfl.sampling); m can also be an array of machines S, giving [len(S) x minibatch_size x x_len] features
+        m = np.asarray(m)
+        if idxs is None:
+            idxs = np.random.randint(0, train_ns[m][..., None], m.shape + (minibatch_size,))
+        return train_X[m[..., None], idxs], train_Y[m[..., None], idxs]
+
+    def grad_eval(w, minibatch_size, m, idxs=None): #stochastic (minibatch) grad eval; m can also be an array of machines S, giving a [len(S) x x_len] stack of their grads
+        return squared_loss_gradient(w, *sample_eval(minibatch_size, m, idxs)) #returns average gradient across minibatch of size minibatch_size (=K), one per machine
+
+    def full_grad_eval(w):
+        return stats_gradient(w, train_stats)
+
+    def hessian_eval(w):
+        return stats_hessian(train_stats)
+
+    def sample_grad_eval(w, minibatch_size, m, idxs=None): #the per-example grads of a minibatch, as grad_eval but not averaged: [len(S) x minibatch_size x x_len] (for per-sample clipping)
+        return squared_loss_sample_gradients(w, *sample_eval(minibatch_size, m, idxs))
+    return f_eval, sample_eval, grad_eval, full_grad_eval, hessian_eval, sample_grad_eval
+
+###Hyperparameter sweep (see dpfl.sweep): jobs are (alg, eps, grid index, stepsize, L, rep, seed); stacked jobs (alg, eps, None, [(grid index, stepsize, L, rep)], seed)###
+_sweep = {} #state of the trial being swept, set in each worker by init_sweep_worker
+job_fields = ('alg', 'eps', 'i', 'stepsize', 'L', 'rep', 'seed') #names of the entries of a job (columns of the results table)
+diverge_at = 5000000000 #losses above this count as diverged (and are the sweep's penalty)
+experiment_clippings = ('batch', 'sample') #the clippings (see dpfl.algorithms.clippings) of MB SGD here: the squared loss is not Lipschitz, so its grads are always clipped
+
+def sweep_jobs(trial, gstepLproduct, cstepLproduct, epsilons, n_reps, stacked=False): #list of jobs (alg, eps, grid index, stepsize, L, rep, seed) for one trial; eps is None for the non-private algs
+    #stacked: one stacked job per (MB or noisyMB, eps) instead of one job per (stepsize, L) and rep
+    jobs = []
+    for a, alg in enumerate(sweep_algs):
+        stepLproduct = gstepLproduct if alg in ('MB', 'noisyMB') else cstepLproduct
+        for e, eps in enumerate(epsilons if alg.startswith('noisy') else [None]):
+            if stacked and alg in ('MB', 'noisyMB'):
+                configs = [(i, stepsize, L, rep) for i, (stepsize, L) in enumerate(stepLproduct) for rep in range(n_reps)]
+                jobs.append((alg, eps, None, configs, cell_seed(base_seed, trial, a, e)))
+                continue
+            for i, (stepsize, L) in enumerate(stepLproduct):
+                for rep in range(n_reps):
+                    jobs.append((alg, eps, i, stepsize, L, rep, cell_seed(base_seed, trial, a, e, i, rep)))
+    return jobs
+
+def init_sweep_worker(trial_data): #trial_data: dict with the trial's train client store and summed suff_stats, the test suff_stats, Fstar and the fixed parameters (x_len, M, Mavail, K, R, loss_freq, delta, n)
+    _sweep.clear()
+    _sweep.update(trial_data)
+    evals = make_evals(trial_data['train_X'], trial_data['train_Y'], trial_data['train_ns'], trial_data['train_stats'])
+    _sweep['f_eval'], _sweep['sample_eval'], _sweep['grad_eval'] = evals[:3]
+    _sweep['sample_grad_eval'] = evals[5] if trial_data['clipping'] == 'sample' else None #per-sample clipping of the MB algorithms
+
+def run_stacked(job): #run a stacked job as one minibatch_sgd_sweep / ACnoisyMB_sgd_sweep; returns the list of its cells
+    alg, eps, _, configs, seed = job
+    t = _sweep
+    np.random.seed(seed)
+    start = time.perf_counter()
+    stepsizes = [stepsize for i, stepsize, L, rep in configs]
+    Ls = [L for i, stepsize, L, rep in configs]
+    if alg == 'MB':
+        W, losses, diverged = minibatch_sgd_sweep(t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsizes, t['loss_freq'], t['f_eval'], t['grad_eval'], Ls, diverge_at=diverge_at, averaging=t['averaging'], dtype=t['dtype'], sample_grad_eval=t['sample_grad_eval'])
+    else: #per-client n and delta
+        W, losses, diverged = ACnoisyMB_sgd_sweep(eps, 1/t['train_ns']**2, t['train_ns'], Ls, t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsizes, t['loss_freq'], t['f_eval'], t['grad_eval'], clip=True, diverge_at=diverge_at, averaging=t['averaging'], accountant=t['accountant'], dtype=t['dtype'], sample_grad_eval=t['sample_grad_eval'])
+    seconds = (time.perf_counter() - start) / len(configs) #wall time of the stacked run, shared out over its configs
+    return [((alg, eps, i, stepsize, L, rep, seed), 'diverged', None, None, losses[c].tolist(), seconds, None, None) if diverged[c] else
+            ((alg, eps, i, stepsize, L, rep, seed), 'converged', losses[c, -1] - t['Fstar'], stats_loss(W[c], t['test_stats']), losses[c].tolist(), seconds, None, None) for c, (i, stepsize, L, rep) in enumerate(configs)]
+
+def run_cell(job): #run one sweep job; returns its cell (job, success, excess train loss, test error, losses, wall time in seconds, simulated clock at each loss check or None,
+    #uplink bytes sent up to each loss check or None)
+    if job[2] is None:
+        return run_stacked(job)
+    alg, eps, i, stepsize, L, rep, seed = job
+    t = _sweep
+    start = time.perf_counter()
+    runtime, latency, tracer, compressor, schedule = job_setup(t, job, t['train_ns'])
+    clock = None
+    if alg == 'MB':
+        iterates, l, success = minibatch_sgd(t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsize, t['loss_freq'], t['f_eval'], t['grad_eval'], L, diverge_at=diverge_at, schedule=schedule, rounds=t.get('rounds'), averaging=t['averaging'], tracer=tracer, dtype=t['dtype'], sample_grad_eval=t['sample_grad_eval'], compressor=compressor)
+    elif alg == 'local' and latency is not None: #straggler-tolerant aggregation, on a simulated clock
+        iterates, l, success, clock = async_local_sgd(t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsize, t['loss_freq'], t['f_eval'], t['sample_eval'], squared_loss_gradient, latency, t['aggregation'], t['k'], t['max_staleness'], L, diverge_at=diverge_at, schedule=schedule, rounds=t.get('rounds'), averaging=t['averaging'], dtype=t['dtype'])
+    elif alg == 'local':
+        iterates, l, success = local_sgd(t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsize, t['loss_freq'], t['f_eval'], t['sample_eval'], squared_loss_gradient, L, diverge_at=diverge_at, schedule=schedule, rounds=t.get('rounds'), averaging=t['averaging'], runtime=runtime, tracer=tracer, dtype=t['dtype'], compressor=compressor)
+    elif alg == 'noisyMB': #per-client n and delta
+        iterates, l, success = ACnoisyMB_sgd(eps, 1/t['train_ns']**2, t['train_ns'], L, t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsize, t['loss_freq'], t['f_eval'], t['grad_eval'], clip=True, diverge_at=diverge_at, schedule=schedule, rounds=t.get('rounds'), averaging=t['averaging'], accountant=t['accountant'], tracer=tracer, dtype=t['dtype'], sample_grad_eval=t['sample_grad_eval'], compressor=compressor)
+    elif latency is not None:
+        iterates, l, success, clock = ACnoisy_async_local_sgd(eps, t['delta'], t['n'], L, t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsize, t['loss_freq'], t['f_eval'], t['sample_eval'], squared_loss_gradient, latency, t['aggregation'], t['k'], t['max_staleness'], clip=True, diverge_at=diverge_at, schedule=schedule, rounds=t.get('rounds'), averaging=t['averaging'], accountant=t['accountant'], dtype=t['dtype'])
+    else:
+        iterates, l, success = ACnoisy_local_sgd(eps, t['delta'], t['n'], L, t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsize, t['loss_freq'], t['f_eval'], t['sample_eval'], squared_loss_gradient, clip=True, diverge_at=diverge_at, schedule=schedule, rounds=t.get('rounds'), averaging=t['averaging'], runtime=runtime, accountant=t['accountant'], tracer=tracer, dtype=t['dtype'], compressor=compressor)
+    seconds = time.perf_counter() - start
+    uplink = job_outputs(t, job, tracer, compressor, l)
+    if success == 'converged':
+        return job, success, l[-1] - t['Fstar'], stats_loss(np.average(iterates, axis=0), t['test_stats']), l, seconds, clock, uplink
+    return job, success, None, None, l, seconds, clock, uplink
+
+##############EXPERIMENTS###################
+
+def experiment(N=10, Mavail=5, R=35, num_trials=20, loss_freq=5, n_reps=3, n_stepsizes=10, Ls=(100, 10000, 1000000, 100000000, 99999999999999999999999999999999),
+               epsilons=(.125, .25, .5, 1, 2, 3), csv='insurance.csv', n_workers=None, stacked=False,
+               client_sampling=None, minibatch_sampling=None, checkpoint_dir=None,
+               tuner='grid', eta=3, averaging='window', federated=False,
+               aggregation=None, first_k=None, max_staleness=None, stragglers=.1, slowdown=10., accountant='moments', trace_dir=None, dtype='float64', clipping='batch',
+               compression=None, compression_ratio=.1, target_excess=None):
+    #runs num_trials trials (each a new train/test split for all N = M clients) of the whole sweep and returns a dict with the test
+    #errors (MSE and NRMSE = RMSE relative to the naive mean predictor) of each algorithm (tuned per trial) and the settings the plots need
+    #n_workers, stacked, client_sampling, minibatch_sampling, checkpoint_dir, tuner, eta, averaging, federated, aggregation, first_k, max_staleness,
+    #stragglers, slowdown, target_excess, accountant, trace_dir, dtype, compression, compression_ratio: the sweep options (see dpfl.sweep)
+    #clipping: what (noisy) MB SGD clips to norm L, each client's MB grad ('batch') or each example's grad ('sample', see dpfl.algorithms.clippings)
+    #other values tried: N = 3, 5, 15; Mavail = 2; R = 50; epsilons = [.25, .5, 1, 2, 3.5, 5]
+    config = {k: v for k, v in locals().items() if k not in ('num_trials', 'n_workers', 'checkpoint_dir', 'trace_dir', 'target_excess')} #what the results depend on (a trial does not depend on num_trials)
+    np.random.seed(base_seed)
+    df = load_insurance(csv)
+    x_len = 7
+    M = N
+    epsilons = list(epsilons)
+    n = int(np.ceil(len(df['charges'])/N))
+    delta = 1/n**2
+    K = minibatch_size(n, max(epsilons), R, delta, accountant) #needed for privacy by the accountant at the largest epsilon
+    path = 'dp_insurance_N={:d}_M={:d}_K={:d}'.format(N,Mavail, K)
+    check_options(experiment_clippings, federated, aggregation, clipping, compression, stacked)
+    n_workers = 1 if federated else os.cpu_count() if n_workers is None else n_workers #a federated run's cores go to its client processes
+    checkpoints = None if checkpoint_dir is None else checkpoint_folder(checkpoint_dir, 'insurance', dict(config, base_seed=base_seed))
+    if trace_dir is not None:
+        os.makedirs(trace_dir, exist_ok=True)
+
+    #########################
+    local_ls = np.zeros(num_trials)
+    MB_ls = np.zeros(num_trials)
+    noisylocal_ls = {}
+    noisyMB_ls = {}
+    noisyMB_tests_trials = {}
+    noisyloc_tests_trials = {}
+
+    noisyMB_NRMSE_trials = {}
+    noisyloc_NRMSE_trials = {}
+    noisyloc_time_trials = {} #simulated time to the target loss (with aggregation)
+
+    for eps in epsilons:
+        noisylocal_ls[eps] = np.ones(num_trials)*99999999999999999999999999999999
+        noisyMB_ls[eps] = np.ones(num_trials)*99999999999999999999999999999999
+        noisyMB_tests_trials[eps] = np.ones(num_trials)*99999999999999999999999999999999
+        noisyloc_tests_trials[eps] = np.ones(num_trials)*99999999999999999999999999999999
+        noisyMB_NRMSE_trials[eps] = np.ones(num_trials)*99999999999999999999999999999999
+        noisyloc_NRMSE_trials[eps] = np.ones(num_trials)*99999999999999999999999999999999
+        noisyloc_time_trials[eps] = np.full(num_trials, np.nan)
+
+    upsilon = np.zeros(num_trials)
+
+    MB_tests_trials = np.zeros(num_trials)
+    loc_tests_trials = np.zeros(num_trials)
+    naiive_tests_trials = np.zeros(num_trials)
+
+    MB_NRMSE_trials = np.zeros(num_trials)
+    loc_NRMSE_trials = np.zeros(num_trials)
+    loc_time_trials = np.full(num_trials, np.nan)
+
+    lg_stepsizes = [np.exp(exponent) for exponent in np.linspace(-8,1,n_stepsizes)] #MB SGD #bigger range than log reg because optimum uncertain: D and L both very big
+    lc_stepsizes = [np.exp(exponent) for exponent in np.linspace(-10,0,n_stepsizes)] #Local SGD
+    gstepLproduct = list(itertools.product(lg_stepsizes, Ls))
+    cstepLproduct = list(itertools.product(lc_stepsizes, Ls))
+
+    runs = [] #run table of each trial
+    for trial in range(num_trials):
+        print("DOING TRIAL", trial)
+        train_features_by_machine, train_labels_by_machine, test_features_by_machine, test_labels_by_machine = splitdata(df, N)
+        train_X, train_Y, train_ns = client_store(train_features_by_machine, train_labels_by_machine) #contiguous (padded) per-machine arrays
+        test_X, test_Y, test_ns = client_store(test_features_by_machine, test_labels_by_machine)
+        train_stats_by_machine, train_stats = suff_stats(train_X, train_Y, train_ns) #XtX, Xty, yty, n per machine and summed over the machines: one pass over the data per split
+        test_stats = suff_stats(test_X, test_Y, test_ns)[1]
+        #aggregate labels (not by machine), for the naive baseline:
+        train_labels = np.concatenate([train_Y[m, :train_ns[m]] for m in range(M)])
+        test_labels = np.concatenate([test_Y[m, :test_ns[m]] for m in range(M)])
+        f_eval, sample_eval, grad_eval, full_grad_eval, hessian_eval = make_evals(train_X, train_Y, train_ns, train_stats)[:5]
+        #closed-form least squares to compute Fstar, wstar, and upsilon:
+        Fstar, wstar = least_squares(f_eval, *train_stats[:2])
+        upsilon[trial] = np.mean(np.sum(stats_gradient(wstar, train_stats_by_machine)**2, axis=1)) #mean over clients of ||grad F_m(wstar)||^2, from their O(d^2) stats
+        print('Fstar = {:.6f}'.format(Fstar))
+        print('upsilon^2 = {:.5f}'.format(upsilon[trial]))
+
+        ###NAIIVE BASELINE (mean of target using all N clients' data)### [used to normalize reported errors]
+        naiive = np.average(train_labels)
+        naiive_tests_trials[trial] = (np.linalg.norm(test_labels - naiive*np.ones(len(test_labels)))**2)/(2*len(test_labels))
+
+        ###Run every (algorithm, eps, stepsize, L, rep) cell of this trial as an independent job###
+        jobs = sweep_jobs(trial, gstepLproduct, cstepLproduct, epsilons, n_reps, stacked)
+        print('Running {:d} sweep jobs on {:d} workers...'.format(len(jobs), n_workers))
+        train_X, train_Y = as_compute(train_X, dtype), as_compute(train_Y, dtype) #the sweep's data in the compute precision (the stats stay float64)
+        runtime = ClientRuntime(train_X, train_Y, squared_loss_gradient, train_ns) if federated else None
+        trial_data = dict(train_X=train_X, train_Y=train_Y, train_ns=train_ns, train_stats=train_stats, test_stats=test_stats,
+                          Fstar=Fstar, x_len=x_len, M=M, Mavail=Mavail, K=K, R=R, loss_freq=loss_freq, delta=delta, n=n,
+                          client_sampling=client_sampling, minibatch_sampling=minibatch_sampling, averaging=averaging, runtime=runtime,
+                          aggregation=aggregation, k=first_k, max_staleness=max_staleness, stragglers=stragglers, slowdown=slowdown, accountant=accountant, trace_dir=trace_dir, dtype=dtype, clipping=clipping,
+                          compression=compression, compression_ratio=compression_ratio)
+        cells = tune_sweep(jobs, trial_data, n_workers, init_sweep_worker, run_cell, None if checkpoints is None else partial(trial_file, checkpoints, trial), tuner, eta)
+        if runtime is not None:
+            print('Client runtime: ' + runtime.summary())
+            runtime.close()
+        if trace_dir is not None:
+            print(merge_job_traces(trace_dir, jobs, os.path.join(trace_dir, 'trial{:03d}.json'.format(trial))).summary())
+        runs.append(run_table(trial, cells, job_fields, R // loss_freq))
+        results, tests = reduce_sweep(cells, len(gstepLproduct), n_reps, diverge_at)
+
+        #####NON PRIVATE Distributed ALGS######
+        MB_results, MB_tests = results['MB', None], tests['MB', None] #average excess risk (and test error) of MBSGD for each (stepsize, L) over n_reps runs
+        MB_ls[trial] = np.min(MB_results)
+        MB_step_index = np.argmin(MB_results)
+        #noisyMB_w_opt = noisyMB_w[noisyMB_step_index]
+        MB_tests_trials[trial] = MB_tests[MB_step_index]
+        MB_NRMSE_trials[trial] = np.sqrt(MB_tests_trials[trial]/naiive_tests_trials[trial])
+        local_results, local_tests = results['local', None], tests['local', None]
+        local_ls[trial] = np.min(local_results)
+        local_stepL_index = np.argmin(local_results)
+        loc_tests_trials[trial] = local_tests[local_stepL_index]
+        loc_NRMSE_trials[trial] = np.sqrt(loc_tests_trials[trial]/naiive_tests_trials[trial])
+        if aggregation is not None:
+            loc_time_trials[trial] = sweep_time_to_loss(cells, 'local', None, local_stepL_index, Fstar, target_excess)
+            print("local SGD time to target loss, trial {:d} is".format(trial), loc_time_trials[trial])
+
+        ####Noisy algorithms####
+        noisyMB_tests = {eps: tests['noisyMB', eps] for eps in epsilons}
+        noisyloc_tests = {eps: tests['noisyloc', eps] for eps in epsilons}
+        for eps in epsilons:
+            noisyMB_results = results['noisyMB', eps]
+            noisy_MB_l = np.min(noisyMB_results)
+            noisyMB_ls[eps][trial] = noisy_MB_l
+            noisyMB_step_index = np.argmin(noisyMB_results)
+            t = noisyMB_tests[eps][noisyMB_step_index]
+            print("noisy MB test error for eps = {:f}, trial {:d} is".format(eps, trial), t)
+            noisyMB_tests_trials[eps][trial] = t
+            noisyMB_NRMSE_trials[eps][trial] = np.sqrt(noisyMB_tests_trials[eps][trial]/naiive_tests_trials[trial])
+
+            noisyloc_results = results['noisyloc', eps]
+            noisy_loc_l = np.min(noisyloc_results)
+            noisylocal_ls[eps][trial] = noisy_loc_l
+            noisyloc_stepL_index = np.argmin(noisyloc_results)
+            u = noisyloc_tests[eps][noisyloc_stepL_index]
+            print("noisy loc test error for eps = {:f}, trial {:d} is".format(eps, trial), u)
+            noisyloc_tests_trials[eps][trial] = u
+            noisyloc_NRMSE_trials[eps][trial] = np.sqrt(noisyloc_tests_trials[eps][trial]/naiive_tests_trials[trial])
+            if aggregation is not None:
+                noisyloc_time_trials[eps][trial] = sweep_time_to_loss(cells, 'noisyloc', eps, noisyloc_stepL_index, Fstar, target_excess)
+                print("noisy loc time to target loss for eps = {:f}, trial {:d} is".format(eps, trial), noisyloc_time_trials[eps][trial])
+
+    return dict(experiment='insurance', config=config, runs=concat_tables(runs), #every run of the sweep (see dpfl.results)
+                epsilons=epsilons, num_trials=num_trials, N=N, Mavail=Mavail, K=K, R=R, path=path, upsilon=upsilon,
+                MB_tests_trials=MB_tests_trials, loc_tests_trials=loc_tests_trials, naiive_tests_trials=naiive_tests_trials,
+                noisyMB_tests_trials=noisyMB_tests_trials, noisyloc_tests_trials=noisyloc_tests_trials,
+                MB_NRMSE_trials=MB_NRMSE_trials, loc_NRMSE_trials=loc_NRMSE_trials,
+                noisyMB_NRMSE_trials=noisyMB_NRMSE_trials, noisyloc_NRMSE_trials=noisyloc_NRMSE_trials,
+                loc_time_trials=loc_time_trials, noisyloc_time_trials=noisyloc_time_trials)
+
+def plot_results(res): #relative test RMSE vs. epsilon plot (with error bars) of the dict returned by experiment
+    import matplotlib.pyplot as plt
+    epsilons, num_trials, N, Mavail, K, R, path, upsilon = (res[k] for k in ('epsilons', 'num_trials', 'N', 'Mavail', 'K', 'R', 'path', 'upsilon'))
+    MB_NRMSE_trials, loc_NRMSE_trials = res['MB_NRMSE_trials'], res['loc_NRMSE_trials']
+    noisyMB_NRMSE_trials, noisyloc_NRMSE_trials = res['noisyMB_NRMSE_trials'], res['noisyloc_NRMSE_trials']
+
+     ###error bar versions###
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    #lower_p = 2.5
+    #upper_p = 97.5
+    lower_p = 5
+    upper_p = 95
+
+    #Noisy MB SGD#
+    noisyMB_errs = np.zeros(len(epsilons))
+    noisyMB_means = {}
+    noisyMB_lows = {}
+    noisyMB_his = {}
+    for e, eps in enumerate(epsilons):
+        noisyMB_means[eps] = np.average(noisyMB_NRMSE_trials[eps])
+        noisyMB_lows[eps] = max(0.0, np.percentile(noisyMB_NRMSE_trials[eps], lower_p))
+        noisyMB_his[eps] = min(1.0, np.percentile(noisyMB_NRMSE_trials[eps], upper_p))
+        noisyMB_errs[e] = (noisyMB_his[eps] - noisyMB_lows[eps])/2
+
+    noisyMB_means_sorted = list(zip(*sorted(noisyMB_means.items())))[1]
+    ax.errorbar(epsilons, noisyMB_means_sorted, yerr = noisyMB_errs, color = '#1f77b4', ecolor='lightblue', mfc='#1f77b4',
+              mec='#1f77b4', capsize = 10, label='Noisy MB SGD after {:d} rounds'.format(R))
+
+    #Noisy Local SGD#
+    noisyloc_errs = np.zeros(len(epsilons))
+    noisyloc_means = {}
+    noisyloc_lows = {}
+    noisyloc_his = {}
+    for e, eps in enumerate(epsilons):
+        noisyloc_means[eps] = np.average(noisyloc_NRMSE_trials[eps])
+        noisyloc_lows[eps] = max(0.0, np.percentile(noisyloc_NRMSE_trials[eps], lower_p))
+        noisyloc_his[eps] = min(1.0, np.percentile(noisyloc_NRMSE_trials[eps], upper_p))
+        noisyloc_errs[e] = (noisyloc_his[eps] - noisyloc_lows[eps])/2
+
+    noisyloc_means_sorted = list(zip(*sorted(noisyloc_means.items())))[1]
+    ax.errorbar(epsilons, noisyloc_means_sorted, yerr = noisyloc_errs, color = '#ff7f0e', ecolor='navajowhite', mfc='#ff7f0e',
+              mec='#ff7f0e',  capsize = 10, label='Noisy Local SGD after {:d} rounds'.format(R))
+
+
+    #MB SGD#
+    MB_errs = np.zeros(len(epsilons))
+    MB_mean = np.average(MB_NRMSE_trials)
+    MB_low = max(0.0, np.percentile(MB_NRMSE_trials, lower_p))
+    MB_hi = min(1.0, np.percentile(MB_NRMSE_trials, upper_p))
+    for e, eps in enumerate(epsilons):
+        MB_errs[e] = (MB_hi - MB_low)/2
+    ax.errorbar(epsilons, [MB_mean]*len(epsilons), yerr = MB_errs, color = '#2ca02c', ecolor='lightgreen', mfc='#2ca02c',
+                mec='#2ca02c', capsize = 10,  label = 'MB SGD after {:d} rounds'.format(R))
+
+    #Local SGD#
+    loc_errs = np.zeros(len(epsilons))
+    loc_mean = np.average(loc_NRMSE_trials)
+    loc_low = max(0.0, np.percentile(loc_NRMSE_trials, lower_p))
+    loc_hi = min(1.0, np.percentile(loc_NRMSE_trials, upper_p))
+    for e, eps in enumerate(epsilons):
+        loc_errs[e] = (loc_hi - loc_low)/2
+    ax.errorbar(epsilons, [loc_mean]*len(epsilons), yerr = loc_errs, color = '#d62728', ecolor='lightcoral', mfc='#d62728',
+              mec='#d62728',  capsize = 10, label = 'Local SGD after {:d} rounds'.format(R))
+
+
+    handles,labels = ax.get_legend_handles_labels()
+    ax.set_xlabel(r'$\epsilon$')
+    #ax.set_ylabel('Avg. Test Error ({:d} Trials)'.format(num_trials))
+    ax.set_ylabel('Relative Test RMSE ({:d} Trials)'.format(num_trials))
+    #ax.set_title('K = {:d}, $\upsilon$={:.2f}, {:d} Trials'.format(K, np.average(upsilon), num_trials))
+    ax.set_title(r'N = {:d}, M = {:d}, K = {:d}, $\upsilon_*^2$={:.1f}'.format(N, Mavail, K, np.average(upsilon)))
+    ax.legend(handles, labels, loc='upper right')
+    plt.savefig('plots' + path + 'errorbar_lin_test_error_vs_epsilon.svg', dpi=400)
+    plt.show()
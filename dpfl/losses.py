@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Losses of the two experiments: logistic loss (MNIST even vs. odd) and squared loss (insurance linear regression),
+with their gradients, Hessians and test metrics, plus the client store and sufficient statistics of the squared loss.
+
+@author: Andrew Lowy
+"""
+
+import numpy as np
+
+
+############################################## Logistic Regression ###############################################
+
+def sigmoid(z):
+    return 1. / (1. + np.exp(-np.clip(z, -15, 15))) #input is clipped i.e. projected onto [-15,15].
+
+# features ("X") is an [\widetilde{N} x d] matrix of features (each row is one data point x_i in R^d)
+# labels is a \widetilde{N}-dimensional vector of labels (0/1)
+#w is a d-dim vector of weights (parameters)
+def logistic_loss(w, features, labels): #returns average val of log loss over data = features, labels
+    probs = sigmoid(np.dot(features,w))
+    log_probs, log_1mprobs = np.log(1e-12 + probs), np.log(1e-12 + 1-probs) #1e-12 to avoid log(0)
+    labels, log_probs, log_1mprobs = (np.asarray(a, dtype=np.float64) for a in (labels, log_probs, log_1mprobs)) #float32 data: the sum is still accumulated in float64
+    return (-1./features.shape[0]) * (np.dot(labels, log_probs) + np.dot(1-labels, log_1mprobs)) #vectorized empirical loss
+
+def logistic_loss_gradient(w, features, labels): #features may also be a stacked [clients x batch x d] array (w a d-vector or one row per client): then the result is one average gradient per client
+    residuals = sigmoid(np.matmul(features, w[..., None])[..., 0]) - labels
+    return np.matmul(residuals[..., None, :], features)[..., 0, :] / features.shape[-2] #matmul here is (batched) matrix mult. result is d-vector per client
+
+def logistic_loss_sample_gradients(w, features, labels): #the gradient of every example of the batch (not averaged): [... x batch x d], features as in logistic_loss_gradient
+    residuals = sigmoid(np.matmul(features, w[..., None])[..., 0]) - labels #one (batched) matmul for the whole batch
+    return residuals[..., None] * features
+
+def logistic_loss_hessian(w, features, labels):
+    s = sigmoid(np.dot(features, w))
+    return np.dot(np.transpose(features) * s * (1 - s), features) / features.shape[0] #dot here is matrix mult: transpose(feat) * feat is dxd matrix  as desired
+
+def test_errs(w, features, labels): #prediction errors of w on data = features [M x n_test x d], labels [M x n_test]; w is a d-vector or a stack of candidate parameters [n_w x d]
+    #returns (error rate of each client, overall error rate); for a stack both get a leading n_w axis
+    W = np.atleast_2d(w)
+    probs = sigmoid(np.matmul(features.reshape(-1, features.shape[-1]), np.transpose(W))) #[M*n_test x n_w], all candidates scored in one matmul
+    mistakes = (probs > 0.5) != labels.reshape(-1, 1) #predict 1 iff prob > 0.5
+    per_client = np.transpose(mistakes.reshape(labels.shape + (W.shape[0],)).mean(axis=1)) #[n_w x M]
+    overall = mistakes.mean(axis=0) #[n_w]
+    if np.ndim(w) == 1:
+        return per_client[0], overall[0]
+    return per_client, overall
+
+def test_err(w, features, labels):  #computes prediction error given a parameter w and data = features, labels (over all clients)
+    return test_errs(w, features, labels)[1]
+
+
+################################################## Linear Regression ###############################################
+
+def squared_loss_gradient(w, features, labels): #normalized by number of samples so it is the average batch gradient; a stacked [clients x batch x d] features array gives one gradient per client
+    residuals = labels - np.matmul(features, w[..., None])[..., 0]
+    return -np.matmul(residuals[..., None, :], features)[..., 0, :]/labels.shape[-1]
+
+def squared_loss_sample_gradients(w, features, labels): #the gradient of every example of the batch (not averaged): [... x batch x d], features as in squared_loss_gradient
+    residuals = labels - np.matmul(features, w[..., None])[..., 0]
+    return -residuals[..., None] * features
+
+def squared_loss_hessian(w,features,labels): #normalized by number of samples
+    return np.transpose(features) @ features/labels.shape[0]
+
+def F_eval(w, X, Y): #avg squared loss on input data set (or batch) X,Y #returns train or test RSS/n (= average train or test error)
+    return (np.linalg.norm(Y - X@w)**2)/(2*Y.shape[0])
+
+#Client data store: one split as contiguous float64 arrays, features [M x n_max x d] and labels [M x n_max] zero padded past each
+#machine's length ns[m]. Padding rows are all zero (including the const column), so they add nothing to any loss, gradient or Hessian
+#below; only the normalization needs the true lengths.
+def client_store(features_by_machine, labels_by_machine): #returns X, Y, ns from lists of per-machine DataFrames (or arrays)
+    ns = np.array([len(labels) for labels in labels_by_machine])
+    X = np.zeros((len(ns), ns.max(), features_by_machine[0].shape[1]))
+    Y = np.zeros((len(ns), ns.max()))
+    for m in range(len(ns)):
+        X[m, :ns[m]] = np.asarray(features_by_machine[m], dtype=float)
+        Y[m, :ns[m]] = np.asarray(labels_by_machine[m], dtype=float)
+    return X, Y, ns
+
+#Sufficient statistics of the squared loss: XtX, Xty, yty and n determine every full-data loss, gradient and Hessian, so after one pass
+#over a split these cost O(d^2) (O(d^3) for a solve) no matter how many examples the machines hold.
+def suff_stats(X, Y, ns): #from a client store: (XtX [M x d x d], Xty [M x d], yty [M], ns [M]) per machine, and the same 4 summed over machines
+    XtX = np.matmul(np.transpose(X, (0, 2, 1)), X)
+    Xty = np.matmul(Y[:, None, :], X)[:, 0, :]
+    yty = np.sum(Y**2, axis=1)
+    by_machine = (XtX, Xty, yty, ns)
+    return by_machine, tuple(np.sum(a, axis=0) for a in by_machine)
+
+def stats_loss(w, stats): #avg squared loss (= F_eval on the data behind stats); per-machine stats give one loss per machine
+    XtX, Xty, yty, n = stats
+    return (yty - 2*Xty@w + (XtX@w)@w)/(2*n)
+
+def stats_gradient(w, stats): #full gradient; per-machine stats give a [M x d] array with the gradient of each F_m
+    XtX, Xty, yty, n = stats
+    return (XtX@w - Xty)/np.expand_dims(n, -1)
+
+def stats_hessian(stats): #Hessian (per machine: [M x d x d])
+    XtX, Xty, yty, n = stats
+    return XtX/np.expand_dims(n, (-2, -1))
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Logistic regression experiment on MNIST: 25 clients, one per (even, odd) pair of digits, each learning even vs. odd.
+
+torchvision and sklearn are only imported when the preprocessing cache has to be built, and matplotlib only when plotting.
+
+Created on Sun Oct 24 13:27:40 2021
+
+@author: Andrew Lowy
+"""
+
+import os
+import itertools
+import time
+from functools import partial
+import numpy as np
+from .losses import logistic_loss, logistic_loss_gradient, logistic_loss_sample_gradients, logistic_loss_hessian, test_errs, test_err
+from .algorithms import local_sgd, minibatch_sgd, ACnoisyMB_sgd, ACnoisy_local_sgd, minibatch_sgd_sweep, ACnoisyMB_sgd_sweep
+from .solvers import newton
+from .sweep import sweep_algs, cell_seed, tune_sweep, reduce_sweep, check_options, job_setup, job_outputs
+from .checkpoint import checkpoint_folder, trial_file
+from .results import run_table, concat_tables
+from .runtime import ClientRuntime
+from .aggregation import async_local_sgd, ACnoisy_async_local_sgd, sweep_time_to_loss
+from .privacy import minibatch_size
+from .tracing import Tracer, merge_job_traces
+from .precision import as_compute
+from .diagnostics import split_diagnostics
+
+
+base_seed = 2021 #all randomness (data splits and the per-job seeds of the sweep) derives from this
+
+q = 1/7 #fraction of mnist data we wish to use; q = 1 -> 8673 train examples per machine; q = 1/10 -> 867 train examples per machine
+###Preprocessing cache: mnist is downloaded, normalized, PCA'd, grouped by digit and split into the 25 even/odd tasks only once per
+###(dim, q, seed); the results are stored as .npy files in data/path/ and each trial memory-maps them and only redraws its indices
+###(with the mixing fraction p, which does not change the cache).
+def save_atomic(fname, arr): #np.save to a temp file, then rename, so a half-written file is never seen as cached
+    np.save(fname + '.tmp.npy', arr)
+    os.replace(fname + '.tmp.npy', fname)
+
+def mnist_cache(dim, path, seed): #builds the preprocessing cache for (dim, q, seed) if it is not there yet and returns its folder
+    cache = os.path.join('data', path, 'mnist_dim={:d}_q={:.6f}_seed={:d}'.format(dim, q, seed))
+    if os.path.exists(os.path.join(cache, 'tasks.npy')): #tasks.npy is written last
+        return cache
+    os.makedirs(cache, exist_ok=True)
+    #only needed (and imported) when the cache has to be built:
+    from torchvision import datasets
+    from sklearn.decomposition import PCA
+    from sklearn.model_selection import train_test_split
+    #download mnist and flatten each image to a 1D array scaled to [0, 1] (what transforms.ToTensor() does; Normalize((0.,), (1.,)) is the identity):
+    mnist = datasets.MNIST('data', download=True, train=True)
+    features = mnist.data.numpy().reshape(len(mnist), -1).astype(np.float32) / 255
+    labels = mnist.targets.numpy()
+    #apply PCA to features to reduce dimensionality to dim
+    features = PCA(n_components=dim, random_state=seed).fit_transform(features)
+
+    ## Group the data by digit
+    #n_m = smallest number of occurences of any one digit (label) in mnist:
+    #n_m = min([np.sum(labels == i) for i in range(10)]) #n_m = 5,421
+    n_m = int(min([np.sum(labels == i) for i in range(10)])*q) #smaller scale version
+    by_number = np.array([features[labels == i][:n_m] for i in range(10)]) #[10 x n_m x dim]: the first n_m feature vectors of each digit
+
+    ## Enumerate the even vs. odd tasks
+    even_numbers = [0,2,4,6,8]
+    odd_numbers = [1,3,5,7,9]
+    #make list of all 25 pairs of (even, odd):
+    even_odd_pairs = list(itertools.product(even_numbers, odd_numbers))
+
+    ## Group data into 25 single even vs single odd tasks
+    #(1,...,1, 0, ... ,0) labels of length 2*n_m (evens first), as the first column of each task:
+    eo_labels = np.concatenate([np.ones(n_m), np.zeros(n_m)]).reshape(-1,1)
+    #all_tasks: [25 x 2*n_m x (1+dim)], one (label, features) array per (e,o) pair of digits (aka task)
+    all_tasks = np.array([np.concatenate([eo_labels, np.concatenate([by_number[e], by_number[o]], axis=0)], axis=1) for (e,o) in even_odd_pairs])
+    #all_nums: 5*n_m evens (label 1) followed by 5*n_m odds (label 0), i.e. all 10*n_m training examples:
+    all_evens = np.concatenate([np.ones((5*n_m,1)), by_number[even_numbers].reshape(-1, dim)], axis=1)
+    all_odds = np.concatenate([np.zeros((5*n_m,1)), by_number[odd_numbers].reshape(-1, dim)], axis=1)
+    all_nums = np.concatenate([all_evens, all_odds], axis=0)
+
+    ###Train/Test split (the same for every machine and every trial)###
+    train_idx, test_idx = train_test_split(np.arange(2*n_m), test_size=0.20, random_state=1)
+
+    save_atomic(os.path.join(cache, 'all_nums.npy'), all_nums)
+    save_atomic(os.path.join(cache, 'train_idx.npy'), train_idx)
+    save_atomic(os.path.join(cache, 'test_idx.npy'), test_idx)
+    save_atomic(os.path.join(cache, 'tasks.npy'), all_tasks)
+    return cache
+
+###Function to draw one trial's per-machine data from the cache:
+    ##Returns 4 arrays: train/test_features_by_machine = , train/test_labels_by_machine, and n_m
+def load_MNIST2(p, dim, path, seed=base_seed):
+    cache = mnist_cache(dim, path, seed)
+    #memory-mapped, so nothing is read until the indices below are gathered:
+    all_tasks = np.load(os.path.join(cache, 'tasks.npy'), mmap_mode='r')
+    all_nums = np.load(os.path.join(cache, 'all_nums.npy'), mmap_mode='r')
+    train_idx = np.load(os.path.join(cache, 'train_idx.npy'))
+    test_idx = np.load(os.path.join(cache, 'test_idx.npy'))
+    n_m = all_tasks.shape[1] // 2
+
+    ## Mix individual tasks with overall task
+    #each worker m gets (1-p)* 2*n = (1-p)*10,842 examples from specific tasks and p*10,842 from mixture of all tasks.
+    #So p=1 -> homogeneous (zeta = 0); p=0 -> heterogeneous
+    n_individual = int(np.round(2*n_m * (1. - p))) #int (1-p)*2n_m = (1-p)*10,842
+    n_all = 2*n_m - n_individual #=int p*2n_m  = p*10,842
+    task_idxs = np.zeros((len(all_tasks), n_individual), dtype=int)
+    all_nums_idxs = np.zeros((len(all_tasks), n_all), dtype=int)
+    for m in range(len(all_tasks)): #m is btwn 0 and 24 inclusive
+        task_idxs[m] = np.random.choice(all_tasks.shape[1], size = n_individual) #specific: randomly choose (1-p)*2n_m examples from 2*n_m = 10,842 examples for task m (one (e,o) pair)
+        all_nums_idxs[m] = np.random.choice(all_nums.shape[0], size = n_all) #mixture of tasks: randomly choose p*2n_m examples from all 54,210 examples (all digits)
+    #machine m gets 10,842 total examples: fraction p are mixed, 1-p are specific to task m (one eo pair):
+    data_by_machine = np.concatenate([all_tasks[np.arange(len(all_tasks))[:, None], task_idxs], all_nums[all_nums_idxs]], axis=1) #[25 x 2*n_m x (1+dim)]
+    train, test = data_by_machine[:, train_idx], data_by_machine[:, test_idx]
+    train_features_by_machine = np.ascontiguousarray(train[:, :, 1:])
+    test_features_by_machine = np.ascontiguousarray(test[:, :, 1:])
+    train_labels_by_machine = np.ascontiguousarray(train[:, :, 0])
+    test_labels_by_machine = np.ascontiguousarray(test[:, :, 0])
+    print(train_features_by_machine.shape)
+    return train_features_by_machine, train_labels_by_machine, test_features_by_machine, test_labels_by_machine, n_m
+
+##################################################################################################################
+
+def make_evals(train_features, train_labels): #returns the loss/gradient oracles of one train split: f_eval, sample_eval, grad_eval, full_grad_eval, hessian_eval, sample_grad_eval
+    x_len = train_features.shape[2]
+    def f_eval(w):
+        return logistic_loss(w, train_features.reshape(-1,x_len), train_labels.reshape(-1))
+
+    def sample_eval(minibatch_size, m, idxs=None): #draw minibatch (unif w/replacement) of size minibatch_size from machine m's dataset, or take the given idxs (see dpfl.sampling); m can also be an array of machines S, giving [len(S) x minibatch_size x x_len] features
+        m = np.asarray(m)
+        if idxs is None:
+            idxs = np.random.randint(0,train_features.shape[1], m.shape + (minibatch_size,))
+        return train_features[m[..., None], idxs, :], train_labels[m[..., None], idxs]
+
+    def grad_eval(w, minibatch_size, m, idxs=None): #stochastic (minibatch) grad eval; m can also be an array of machines S, giving a [len(S) x x_len] stack of their grads
+        return logistic_loss_gradient(w, *sample_eval(minibatch_size, m, idxs)) #returns average gradient across minibatch of size minibatch_size (=K), one per machine
+
+    def full_grad_eval(w):
+        return logistic_loss_gradient(w, train_features.reshape(-1,x_len), train_labels.reshape(-1))
+
+    def hessian_eval(w):
+        return logistic_loss_hessian(w, train_features.reshape(-1,x_len), train_labels.reshape(-1))
+
+    def sample_grad_eval(w, minibatch_size, m, idxs=None): #the per-example grads of a minibatch, as grad_eval but not averaged: [len(S) x minibatch_size x x_len] (for per-sample clipping)
+        return logistic_loss_sample_gradients(w, *sample_eval(minibatch_size, m, idxs))
+    return f_eval, sample_eval, grad_eval, full_grad_eval, hessian_eval, sample_grad_eval
+
+###Hyperparameter sweep (see dpfl.sweep): jobs are (alg, eps, stepsize index, stepsize, rep, seed); stacked jobs (alg, eps, None, [(stepsize index, stepsize, rep)], seed)###
+_sweep = {} #state of the trial being swept, set in each worker by init_sweep_worker
+job_fields = ('alg', 'eps', 'i', 'stepsize', 'rep', 'seed') #names of the entries of a job (columns of the results table)
+experiment_clippings = ('none', 'sample') #the clippings (see dpfl.algorithms.clippings) of noisy MB SGD here: the logistic loss is L-Lipschitz, so its MB grads are not clipped
+
+def sweep_jobs(trial, lg_stepsizes, lc_stepsizes, epsilons, n_reps, stacked=False): #list of jobs (alg, eps, stepsize index, stepsize, rep, seed) for one trial; eps is None for the non-private algs
+    #stacked: one stacked job per (MB or noisyMB, eps) instead of one job per stepsize and rep
+    jobs = []
+    for a, alg in enumerate(sweep_algs):
+        stepsizes = lg_stepsizes if alg in ('MB', 'noisyMB') else lc_stepsizes
+        for e, eps in enumerate(epsilons if alg.startswith('noisy') else [None]):
+            if stacked and alg in ('MB', 'noisyMB'):
+                configs = [(i, stepsize, rep) for i, stepsize in enumerate(stepsizes) for rep in range(n_reps)]
+                jobs.append((alg, eps, None, configs, cell_seed(base_seed, trial, a, e)))
+                continue
+            for i, stepsize in enumerate(stepsizes):
+                for rep in range(n_reps):
+                    jobs.append((alg, eps, i, stepsize, rep, cell_seed(base_seed, trial, a, e, i, rep)))
+    return jobs
+
+def init_sweep_worker(trial_data): #trial_data: dict with the trial's train/test arrays, Fstar, L and the fixed parameters (x_len, M, Mavail, K, R, loss_freq, delta, n)
+    _sweep.clear()
+    _sweep.update(trial_data)
+    evals = make_evals(trial_data['train_features'], trial_data['train_labels'])
+    _sweep['f_eval'], _sweep['sample_eval'], _sweep['grad_eval'] = evals[:3]
+    _sweep['sample_grad_eval'] = evals[5] if trial_data['clipping'] == 'sample' else None #per-sample clipping of the MB algorithms
+
+def run_stacked(job): #run a stacked job as one minibatch_sgd_sweep / ACnoisyMB_sgd_sweep; returns the list of its cells
+    alg, eps, _, configs, seed = job
+    t = _sweep
+    np.random.seed(seed)
+    start = time.perf_counter()
+    stepsizes = [stepsize for i, stepsize, rep in configs]
+    if alg == 'MB':
+        W, losses, diverged = minibatch_sgd_sweep(t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsizes, t['loss_freq'], t['f_eval'], t['grad_eval'], averaging=t['averaging'], dtype=t['dtype'])
+    else:
+        W, losses, diverged = ACnoisyMB_sgd_sweep(eps, t['delta'], t['n'], t['L'], t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsizes, t['loss_freq'], t['f_eval'], t['grad_eval'], clip=t['clipping'] == 'sample', averaging=t['averaging'], accountant=t['accountant'], dtype=t['dtype'], sample_grad_eval=t['sample_grad_eval'])
+    seconds = (time.perf_counter() - start) / len(configs) #wall time of the stacked run, shared out over its configs
+    tests = test_errs(W, t['test_features'], t['test_labels'])[1] #all configs' test errors in one matmul
+    return [((alg, eps, i, stepsize, rep, seed), 'diverged', None, None, losses[c].tolist(), seconds, None, None) if diverged[c] else
+            ((alg, eps, i, stepsize, rep, seed), 'converged', losses[c, -1] - t['Fstar'], tests[c], losses[c].tolist(), seconds, None, None) for c, (i, stepsize, rep) in enumerate(configs)]
+
+def run_cell(job): #run one sweep job; returns its cell (job, success, excess train loss, test error, losses, wall time in seconds, simulated clock at each loss check or None,
+    #uplink bytes sent up to each loss check or None)
+    if job[2] is None:
+        return run_stacked(job)
+    alg, eps, i, stepsize, rep, seed = job
+    t = _sweep
+    start = time.perf_counter()
+    runtime, latency, tracer, compressor, schedule = job_setup(t, job, t['train_features'].shape[1])
+    clock = None
+    if alg == 'MB':
+        iterates, l, success = minibatch_sgd(t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsize, t['loss_freq'], t['f_eval'], t['grad_eval'], schedule=schedule, rounds=t.get('rounds'), averaging=t['averaging'], tracer=tracer, dtype=t['dtype'], compressor=compressor)
+    elif alg == 'local' and latency is not None: #straggler-tolerant aggregation, on a simulated clock
+        iterates, l, success, clock = async_local_sgd(t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsize, t['loss_freq'], t['f_eval'], t['sample_eval'], logistic_loss_gradient, latency, t['aggregation'], t['k'], t['max_staleness'], schedule=schedule, rounds=t.get('rounds'), averaging=t['averaging'], dtype=t['dtype'])
+    elif alg == 'local':
+        iterates, l, success = local_sgd(t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsize, t['loss_freq'], t['f_eval'], t['sample_eval'], logistic_loss_gradient, schedule=schedule, rounds=t.get('rounds'), averaging=t['averaging'], runtime=runtime, tracer=tracer, dtype=t['dtype'], compressor=compressor)
+    elif alg == 'noisyMB':
+        iterates, l, success = ACnoisyMB_sgd(eps, t['delta'], t['n'], t['L'], t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsize, t['loss_freq'], t['f_eval'], t['grad_eval'], clip=t['clipping'] == 'sample', schedule=schedule, rounds=t.get('rounds'), averaging=t['averaging'], accountant=t['accountant'], tracer=tracer, dtype=t['dtype'], sample_grad_eval=t['sample_grad_eval'], compressor=compressor)
+    elif latency is not None:
+        iterates, l, success, clock = ACnoisy_async_local_sgd(eps, t['delta'], t['n'], t['L'], t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsize, t['loss_freq'], t['f_eval'], t['sample_eval'], logistic_loss_gradient, latency, t['aggregation'], t['k'], t['max_staleness'], schedule=schedule, rounds=t.get('rounds'), averaging=t['averaging'], accountant=t['accountant'], dtype=t['dtype'])
+    else:
+        iterates, l, success = ACnoisy_local_sgd(eps, t['delta'], t['n'], t['L'], t['x_len'], t['M'], t['Mavail'], t['K'], t['R'], stepsize, t['loss_freq'], t['f_eval'], t['sample_eval'], logistic_loss_gradient, schedule=schedule, rounds=t.get('rounds'), averaging=t['averaging'], runtime=runtime, accountant=t['accountant'], tracer=tracer, dtype=t['dtype'], compressor=compressor)
+    seconds = time.perf_counter() - start
+    uplink = job_outputs(t, job, tracer, compressor, l)
+    if success == 'converged':
+        return job, success, l[-1] - t['Fstar'], test_err(np.average(iterates, axis=0), t['test_features'], t['test_labels']), l, seconds, clock, uplink
+    return job, success, None, None, l, seconds, clock, uplink
+
+##################################################################################################################
+
+def experiment(p=0, dim=50, M=25, Mavail=12, num_trials=20, loss_freq=5, n_reps=3, n_stepsizes=10, epsilons=(0.75, 1.5, 3, 6, 12, 18), R=35,
+               data_path='temp', n_workers=None, stacked=False,
+               client_sampling=None, minibatch_sampling=None, checkpoint_dir=None,
+               tuner='grid', eta=3, averaging='window', federated=False,
+               aggregation=None, first_k=None, max_staleness=None, stragglers=.1, slowdown=10., accountant='moments', trace_dir=None, dtype='float64', clipping='none',
+               compression=None, compression_ratio=.1, target_excess=None):
+    #runs num_trials trials (each a new draw of every client's data) of the whole sweep and returns a dict with the test errors of each
+    #algorithm (tuned per trial) and the settings the plots need
+    #p = 0 for full heterogeneity; can also try p = 1 for i.i.d.
+    #data_path: folder (in data) of the preprocessing cache
+    #n_workers, stacked, client_sampling, minibatch_sampling, checkpoint_dir, tuner, eta, averaging, federated, aggregation, first_k, max_staleness,
+    #stragglers, slowdown, target_excess, accountant, trace_dir, dtype, compression, compression_ratio: the sweep options (see dpfl.sweep)
+    #clipping: 'sample' clips each example's grad of noisy MB SGD to norm L (see dpfl.algorithms.clippings); 'none' (default): no clipping, the loss being L-Lipschitz
+    config = {k: v for k, v in locals().items() if k not in ('num_trials', 'n_workers', 'checkpoint_dir', 'trace_dir', 'target_excess')} #what the results depend on (a trial does not depend on num_trials)
+    np.set_printoptions(precision=3, linewidth=240, suppress=True)
+    np.random.seed(base_seed)
+    epsilons = list(epsilons)
+    n_m = load_MNIST2(p, dim, data_path)[-1] #number of examples (train and test) per digit per machine
+    n = int(n_m*2*0.8) #total number of TRAINING examples (two digits) per machine
+    delta = 1/(n**2)
+    #Note: for q = 1/7, we have 2*math.log(1/delta) = 28.485009812978166 (= maximal allowable epsilon for DP via moments account)
+    K = minibatch_size(n, max(epsilons), R, delta, accountant) #needed for privacy by the accountant at the largest epsilon that we test
+    path = 'dp_mnist_p={:.2f}_K={:d}_R={:d}'.format(p,K,R)
+    check_options(experiment_clippings, federated, aggregation, clipping, compression, stacked)
+    n_workers = 1 if federated else os.cpu_count() if n_workers is None else n_workers #a federated run's cores go to its client processes
+    checkpoints = None if checkpoint_dir is None else checkpoint_folder(checkpoint_dir, 'mnist', dict(config, base_seed=base_seed))
+    if trace_dir is not None:
+        os.makedirs(trace_dir, exist_ok=True)
+
+    local_ls = np.zeros(num_trials)
+    MB_ls = np.zeros(num_trials)
+    noisylocal_ls = {}
+    noisyMB_ls = {}
+    noisyMB_tests_trials = {}
+    noisyloc_tests_trials = {}
+    loc_time_trials = np.full(num_trials, np.nan) #simulated time to the target loss (with aggregation)
+    noisyloc_time_trials = {}
+
+    for eps in epsilons:
+        noisylocal_ls[eps] = np.ones(num_trials)*1000
+        noisyMB_ls[eps] = np.ones(num_trials)*1000
+        noisyMB_tests_trials[eps] = np.ones(num_trials)*1000
+        noisyloc_tests_trials[eps] = np.ones(num_trials)*1000
+        noisyloc_time_trials[eps] = np.full(num_trials, np.nan)
+
+    upsilons = np.zeros(num_trials)
+    newton_iterations = np.zeros(num_trials, dtype=int) #cost of each trial's reference solve
+    newton_factorizations = np.zeros(num_trials, dtype=int)
+
+    MB_tests_trials = np.zeros(num_trials)
+    loc_tests_trials = np.zeros(num_trials)
+
+    runs = [] #run table of each trial
+    for trial in range(num_trials):
+        print("DOING TRIAL", trial)
+        train_features, train_labels, test_features, test_labels = load_MNIST2(p,dim,data_path)[0:4]
+        x_len = train_features.shape[2] #dim of data (after PCA)
+        f_eval, sample_eval, grad_eval, full_grad_eval, hessian_eval = make_evals(train_features, train_labels)[:5]
+        #Newton (warm-started from the previous trial's wstar) to compute Fstar, wstar, and zeta:
+        newton_tracer = None if trace_dir is None else Tracer('newton')
+        Fstar, wstar, newton_stats = newton(wstar if trial > 0 else np.zeros(x_len), f_eval, full_grad_eval, hessian_eval, tracer=newton_tracer)
+        newton_iterations[trial], newton_factorizations[trial] = newton_stats['iterations'], newton_stats['factorizations']
+        if newton_tracer is not None:
+            newton_tracer.save(os.path.join(trace_dir, 'trial{:03d}_newton.json'.format(trial)))
+        #zeta (the mean over clients of ||grad F_m(wstar)||^2) and the Lipschitz constant of log loss, L <= 2 max ||x|| over all clients:
+        diagnostics = split_diagnostics(train_features, train_labels, wstar, logistic_loss_gradient)
+        upsilons[trial], L = diagnostics['upsilon'], diagnostics['L']
+        print('Fstar = {:.6f}'.format(Fstar))
+        print('zeta = {:.5f}'.format(upsilons[trial]))
+        lg_stepsizes = [np.exp(exponent) for exponent in np.linspace(-6,0,n_stepsizes)] #MB SGD
+        lc_stepsizes = [np.exp(exponent) for exponent in np.linspace(-8,-1,n_stepsizes)] #Local SGD
+        ###Run every (algorithm, eps, stepsize, rep) cell of this trial as an independent job###
+        jobs = sweep_jobs(trial, lg_stepsizes, lc_stepsizes, epsilons, n_reps, stacked)
+        print('Running {:d} sweep jobs on {:d} workers...'.format(len(jobs), n_workers))
+        train_features, train_labels = as_compute(train_features, dtype), as_compute(train_labels, dtype) #the sweep's data in the compute precision
+        runtime = ClientRuntime(train_features, train_labels, logistic_loss_gradient) if federated else None
+        trial_data = dict(train_features=train_features, train_labels=train_labels, test_features=test_features, test_labels=test_labels,
+                          Fstar=Fstar, L=L, x_len=x_len, M=M, Mavail=Mavail, K=K, R=R, loss_freq=loss_freq, delta=delta, n=n,
+                          client_sampling=client_sampling, minibatch_sampling=minibatch_sampling, averaging=averaging, runtime=runtime,
+                          aggregation=aggregation, k=first_k, max_staleness=max_staleness, stragglers=stragglers, slowdown=slowdown, accountant=accountant, trace_dir=trace_dir, dtype=dtype, clipping=clipping,
+                          compression=compression, compression_ratio=compression_ratio)
+        cells = tune_sweep(jobs, trial_data, n_workers, init_sweep_worker, run_cell, None if checkpoints is None else partial(trial_file, checkpoints, trial), tuner, eta)
+        if runtime is not None:
+            print('Client runtime: ' + runtime.summary())
+            runtime.close()
+        if trace_dir is not None:
+            print(merge_job_traces(trace_dir, jobs, os.path.join(trace_dir, 'trial{:03d}.json'.format(trial))).summary())
+        runs.append(run_table(trial, cells, job_fields, R // loss_freq))
+        results, tests = reduce_sweep(cells, n_stepsizes, n_reps, 100)
+        ###Non-private algorithms###
+        MB_results, MB_tests = results['MB', None], tests['MB', None] #average excess risk (and test error) of MBSGD for each stepsize over n_reps runs
+        MB_ls[trial] = np.min(MB_results)
+        MB_step_index = np.argmin(MB_results)
+        #noisyMB_w_opt = noisyMB_w[noisyMB_step_index]
+        MB_tests_trials[trial] = MB_tests[MB_step_index]
+        local_results, local_tests = results['local', None], tests['local', None]
+        local_ls[trial] = np.min(local_results)
+        local_step_index = np.argmin(local_results)
+        loc_tests_trials[trial] = local_tests[local_step_index]
+        if aggregation is not None:
+            loc_time_trials[trial] = sweep_time_to_loss(cells, 'local', None, local_step_index, Fstar, target_excess)
+            print("local SGD time to target loss, trial {:d} is".format(trial), loc_time_trials[trial])
+
+        #######Noisy Algs#######
+        noisyMB_tests = {eps: tests['noisyMB', eps] for eps in epsilons}
+        noisyloc_tests = {eps: tests['noisyloc', eps] for eps in epsilons}
+        for eps in epsilons:
+            noisyMB_results = results['noisyMB', eps]
+            noisy_MB_l = np.min(noisyMB_results)
+            noisyMB_ls[eps][trial] = noisy_MB_l
+            noisyMB_step_index = np.argmin(noisyMB_results)
+            t = noisyMB_tests[eps][noisyMB_step_index]
+            print("noisy MB test error for eps = {:f}, trial {:d} is".format(eps, trial), t)
+            noisyMB_tests_trials[eps][trial] = t
+
+            noisyloc_results = results['noisyloc', eps]
+            noisy_loc_l = np.min(noisyloc_results)
+            noisylocal_ls[eps][trial] = noisy_loc_l
+            noisyloc_stepL_index = np.argmin(noisyloc_results)
+            u = noisyloc_tests[eps][noisyloc_stepL_index]
+            print("noisy loc test error for eps = {:f}, trial {:d} is".format(eps, trial), u)
+            noisyloc_tests_trials[eps][trial] = u
+            if aggregation is not None:
+                noisyloc_time_trials[eps][trial] = sweep_time_to_loss(cells, 'noisyloc', eps, noisyloc_stepL_index, Fstar, target_excess)
+                print("noisy loc time to target loss for eps = {:f}, trial {:d} is".format(eps, trial), noisyloc_time_trials[eps][trial])
+
+    print("noisy MB test errors", noisyMB_tests_trials)
+    print("noisy loc test errors", noisyloc_tests_trials)
+    print("MB test errors", MB_tests_trials)
+    print("local SGD test errors", loc_tests_trials)
+    print("upsilon^2", upsilons)
+    return dict(experiment='mnist', config=config, runs=concat_tables(runs), #every run of the sweep (see dpfl.results)
+                epsilons=epsilons, num_trials=num_trials, Mavail=Mavail, K=K, R=R, path=path, upsilons=upsilons,
+                newton_iterations=newton_iterations, newton_factorizations=newton_factorizations,
+                MB_tests_trials=MB_tests_trials, loc_tests_trials=loc_tests_trials,
+                noisyMB_tests_trials=noisyMB_tests_trials, noisyloc_tests_trials=noisyloc_tests_trials,
+                loc_time_trials=loc_time_trials, noisyloc_time_trials=noisyloc_time_trials)
+
+def plot_results(res): #test error vs. epsilon plots (with and without error bars) of the dict returned by experiment
+    import matplotlib.pyplot as plt
+    epsilons, num_trials, Mavail, K, R, path, upsilons = (res[k] for k in ('epsilons', 'num_trials', 'Mavail', 'K', 'R', 'path', 'upsilons'))
+    MB_tests_trials, loc_tests_trials = res['MB_tests_trials'], res['loc_tests_trials']
+    noisyMB_tests_trials, noisyloc_tests_trials = res['noisyMB_tests_trials'], res['noisyloc_tests_trials']
+
+     ###error bar versions###
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    #lower_p = 2.5
+    #upper_p = 97.5
+    lower_p = 5
+    upper_p = 95
+
+    #Noisy MB SGD#
+    noisyMB_errs = np.zeros(len(epsilons))
+    noisyMB_means = {}
+    noisyMB_lows = {}
+    noisyMB_his = {}
+    for e, eps in enumerate(epsilons):
+        noisyMB_means[eps] = np.average(noisyMB_tests_trials[eps])
+        noisyMB_lows[eps] = max(0.0, np.percentile(noisyMB_tests_trials[eps], lower_p))
+        noisyMB_his[eps] = min(1.0, np.percentile(noisyMB_tests_trials[eps], upper_p))
+        noisyMB_errs[e] = (noisyMB_his[eps] - noisyMB_lows[eps])/2
+
+    noisyMB_means_sorted = list(zip(*sorted(noisyMB_means.items())))[1]
+    ax.errorbar(epsilons, noisyMB_means_sorted, yerr = noisyMB_errs, color = '#1f77b4', ecolor='lightblue', mfc='#1f77b4',
+              mec='#1f77b4', capsize = 10, label='Noisy MB SGD after {:d} rounds'.format(R))
+
+    #Noisy Local SGD#
+    noisyloc_errs = np.zeros(len(epsilons))
+    noisyloc_means = {}
+    noisyloc_lows = {}
+    noisyloc_his = {}
+    for e, eps in enumerate(epsilons):
+        noisyloc_means[eps] = np.average(noisyloc_tests_trials[eps])
+        noisyloc_lows[eps] = max(0.0, np.percentile(noisyloc_tests_trials[eps], lower_p))
+        noisyloc_his[eps] = min(1.0, np.percentile(noisyloc_tests_trials[eps], upper_p))
+        noisyloc_errs[e] = (noisyloc_his[eps] - noisyloc_lows[eps])/2
+
+    noisyloc_means_sorted = list(zip(*sorted(noisyloc_means.items())))[1]
+    ax.errorbar(epsilons, noisyloc_means_sorted, yerr = noisyloc_errs, color = '#ff7f0e', ecolor='navajowhite', mfc='#ff7f0e',
+              mec='#ff7f0e',  capsize = 10, label='Noisy Local SGD after {:d} rounds'.format(R))
+
+
+    #MB SGD#
+    MB_errs = np.zeros(len(epsilons))
+    MB_mean = np.average(MB_tests_trials)
+    MB_low = max(0.0, np.percentile(MB_tests_trials, lower_p))
+    MB_hi = min(1.0, np.percentile(MB_tests_trials, upper_p))
+    for e, eps in enumerate(epsilons):
+        MB_errs[e] = (MB_hi - MB_low)/2
+    ax.errorbar(epsilons, [MB_mean]*len(epsilons), yerr = MB_errs, color = '#2ca02c', ecolor='lightgreen', mfc='#2ca02c',
+                mec='#2ca02c', capsize = 10,  label = 'MB SGD after {:d} rounds'.format(R))
+
+    #Local SGD#
+    loc_errs = np.zeros(len(epsilons))
+    loc_mean = np.average(loc_tests_trials)
+    loc_low = max(0.0, np.percentile(loc_tests_trials, lower_p))
+    loc_hi = min(1.0, np.percentile(loc_tests_trials, upper_p))
+    for e, eps in enumerate(epsilons):
+        loc_errs[e] = (loc_hi - loc_low)/2
+    ax.errorbar(epsilons, [loc_mean]*len(epsilons), yerr = loc_errs, color = '#d62728', ecolor='lightcoral', mfc='#d62728',
+              mec='#d62728',  capsize = 10, label = 'Local SGD after {:d} rounds'.format(R))
+
+
+    handles,labels = ax.get_legend_handles_labels()
+    ax.set_xlabel(r'$\epsilon$')
+    ax.set_ylabel('Avg. Test Error ({:d} Trials)'.format(num_trials))
+    #ax.set_title('K = {:d}, $\upsilon$={:.2f}, {:d} Trials'.format(K, np.average(upsilon), num_trials))
+    ax.set_title(r'M = {:d}, K = {:d}, $\upsilon_*^2$={:.1f}'.format(Mavail, K, np.average(upsilons)))
+    ax.legend(handles, labels, loc='upper right')
+    plt.savefig('plots' + path + 'errorbar_mnist_test_error_vs_epsilon.png', dpi=400)
+    plt.show()
+
+    ###no error bars version###
+    ###PLOT test error vs. epsilon###
+    fig2 = plt.figure()
+    ax2 = fig2.add_subplot(111)
+    noisyMB_test_errors_sorted = sorted(noisyMB_tests_trials.items()) # sorted by key, return a list of tuples
+    noisyloc_test_errors_sorted = sorted(noisyloc_tests_trials.items())
+    l = list(zip(*noisyMB_test_errors_sorted))[1]
+    m = []
+    for i in range(len(l)):
+        m.append(np.average(l[i]))
+    l2 = list(zip(*noisyloc_test_errors_sorted))[1]
+    m2 = []
+    for i in range(len(l2)):
+        m2.append(np.average(l2[i]))
+
+    ax2.plot(epsilons, m, label='Noisy MB SGD after {:d} rounds'.format(R))
+    ax2.plot(epsilons, m2,label='Noisy Local SGD after {:d} rounds'.format(R))
+    ax2.plot(epsilons, [np.average(MB_tests_trials)]*len(epsilons), label = 'MB SGD after {:d} rounds'.format(R))
+    ax2.plot(epsilons, [np.average(loc_tests_trials)]*len(epsilons), label = 'Local SGD after {:d} rounds'.format(R))
+    handles,labels = ax2.get_legend_handles_labels()
+    ax2.set_xlabel(r'$\epsilon$')
+    ax2.set_ylabel('Avg. Test Error ({:d} Trials)'.format(num_trials))
+    ax2.set_title(r'M = {:d}, K = {:d}, $\upsilon_*^2$={:.2f}'.format(Mavail, K, np.average(upsilons)))
+    ax2.legend(handles, labels, loc='upper right')
+    plt.savefig('plots' + path + 'mnist_test_error_vs_epsilon.png', dpi=400)
+    plt.show()
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gaussian noise of the locally differentially private algorithms; its scale comes from the privacy accountant (see dpfl.privacy).
+
+@author: Andrew Lowy
+"""
+
+import numpy as np
+from .privacy import sigma, noise_scale
+
+
+def noise_sd(eps, delta, n, R, L): #std dev of the moments account noise (see dpfl.privacy.sigma, which caches it across the sweep)
+    return sigma(eps, delta, n, R, 1, L)
+
+def gaussian(sd, d, size=None, rng=None, dtype=None): #isotropic noise of std dev sd: [size x d]; sd a scalar, or one per row of the last axis of size (e.g. per client)
+    #rng: a client's own noise stream (see client_noise_streams); default is the global np.random state
+    #dtype: compute dtype to round the noise to (drawn in float64 either way, see dpfl.precision); None: float64
+    rng = np.random if rng is None else rng
+    shape = (d,) if size is None else tuple(np.atleast_1d(size)) + (d,)
+    noise = (sd if np.ndim(sd) == 0 else np.asarray(sd)[:, None]) * rng.standard_normal(shape)
+    return noise if dtype is None else noise.astype(dtype, copy=False)
+
+def gauss_AC(d, eps, delta, n, R, L, K, size=None, rng=None, accountant='moments'): #noise of the accountant's scale for (eps, delta, n, R, K, L), drawn as sigma * standard normal
+    #size=(..., Mavail) draws a whole [size x d] block at once (n, delta may then be per-client arrays of length Mavail)
+    return gaussian(noise_scale(eps, delta, n, R, K, L, accountant), d, size, rng)
+
+def client_noise_streams(seed, M): #one independent, reproducible noise stream (np.random.Generator) per client, spawned from seed
+    return [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(M)]
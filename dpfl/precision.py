@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compute precision of the training runs (dtype=... of the algorithms and experiments):
+ - 'float64' (default): everything in double precision, as always
+ - 'float32': the train features and labels the runs see, their iterates (and averages), gradients, clip factors and
+   privacy noise are float32 end to end, which halves the memory traffic of the gradient kernels and the data sent to
+   the sweep workers and client processes
+float64 is kept for the reference quantities (Fstar and wstar of newton / least_squares, the sufficient statistics, L
+and zeta, all computed before the data is cast) and for the loss accumulation (see dpfl.losses.logistic_loss). The
+noise is drawn in float64 and rounded, so a float32 run uses the same random streams as a float64 one.
+The scalars multiplying float32 arrays must be python floats (or float32): numpy promotes float32 arrays to float64
+when combined with a np.float64 scalar.
+"""
+
+import numpy as np
+
+
+dtypes = ('float64', 'float32')
+
+def compute_dtype(dtype): #the np.dtype of a precision policy (a name in dtypes or a dtype)
+    dtype = np.dtype(dtype)
+    if dtype.name not in dtypes:
+        raise ValueError('unsupported dtype {!r} (one of {})'.format(dtype.name, ', '.join(dtypes)))
+    return dtype
+
+def as_compute(a, dtype): #the array a in the compute dtype (a itself if it already is)
+    return np.asarray(a, dtype=compute_dtype(dtype))
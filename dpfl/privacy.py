@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Privacy accounting of the noisy algorithms: the Gaussian noise scale sigma that makes R rounds (of K steps) of a client
+with n examples (eps, delta)-LDP for L-Lipschitz losses, and the minibatch size K the accounting needs, in one place for
+both experiments. Two accountants:
+ - 'moments' (default): moments account (RDP), sigma^2 = 8 L^2 R log(1/delta) / (n^2 eps^2), for K >= n sqrt(eps/(4R))
+ - 'advanced': advanced composition, sigma^2 = 256 L^2 R log(2.5 R K/(delta n)) log(2/delta) / (n^2 eps^2), for
+   K >= n eps / (4 sqrt(2 R log(2/delta)))
+sigma is memoized per (eps, delta, n, R, K, L, accountant), so a sweep computes each once per process however many rounds,
+stepsizes and reps use it; noise_scale gives the whole per-client table of a run, which the algorithms index each round.
+"""
+
+import math
+from functools import lru_cache
+import numpy as np
+
+
+accountants = ('moments', 'advanced')
+
+@lru_cache(maxsize=None)
+def sigma(eps, delta, n, R, K, L, accountant='moments'): #noise std dev per coordinate of each noisy grad (K: steps per round; only 'advanced' uses it)
+    if accountant == 'moments':
+        return math.sqrt(8*(L**2)*R*math.log(1/delta)/(n**2 * eps**2))
+    if accountant == 'advanced':
+        return math.sqrt(256*(L**2)*R*math.log(2.5*R*K/(delta*n))*math.log(2/delta)/(n**2 * eps**2))
+    raise ValueError('unknown accountant {!r} (one of {})'.format(accountant, ', '.join(accountants)))
+
+def noise_scale(eps, delta, n, R, K, L, accountant='moments'): #sigma of a run: a scalar, or (n, delta per-client arrays) one per client [M]
+    if np.ndim(n) == 0 and np.ndim(delta) == 0:
+        return sigma(eps, delta, n, R, K, L, accountant)
+    n, delta = np.broadcast_arrays(n, delta)
+    return np.array([sigma(eps, float(delta_m), float(n_m), R, K, L, accountant) for delta_m, n_m in zip(delta, n)])
+
+def minibatch_size(n, eps, R, delta, accountant='moments'): #the K each client must use per round for the accounting to hold at eps (the largest eps swept)
+    if accountant == 'moments':
+        return int(max(1, n*math.sqrt(eps/(4*R))))
+    if accountant == 'advanced':
+        return int(max(1, n*eps/(4*math.sqrt(2*R*math.log(2/delta)))))
+    raise ValueError('unknown accountant {!r} (one of {})'.format(accountant, ', '.join(accountants)))
+
+def epsilon(sd, delta, n, R, K, L, accountant='moments'): #the eps that noise of std dev sd buys (the inverse of sigma in eps)
+    return sigma(1., delta, n, R, K, L, accountant) / sd
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Results store: every run of an experiment (one row per sweep cell) and the per-trial results of its experiment() in one
+columnar .npz table, so that plots and analysis over all runs only need load_results, not a rerun of the sweep
+(`python -m dpfl plot <file>` redraws the experiment's plots from it).
+
+Run columns (run_*): trial, alg, eps (nan for the non-private algs), i (grid index), stepsize, L (nan if not swept), rep,
+seed, converged, excess (train excess risk), test (test error; both nan if diverged), seconds (wall time), losses
+([runs x R//loss_freq] loss trace, nan-padded after a divergence) and clock (the simulated clock at each loss check of the
+runs with straggler-tolerant aggregation, see dpfl.aggregation; nan for the others) and uplink (the bytes the clients sent
+up to each loss check of the runs with compression, see dpfl.compression; nan for the others).
+Trial columns (trial_*): the per-trial arrays of the result dict; those given per eps are [len(epsilons) x num_trials].
+The rest of the result dict (settings, the experiment's configuration) is kept as json in meta.
+"""
+
+import json
+import os
+import numpy as np
+
+
+def run_table(trial, cells, job_fields, n_checks): #columns of one trial's sweep cells; job_fields names the entries of a job, e.g. ('alg', 'eps', 'i', 'stepsize', 'rep', 'seed')
+    jobs = [dict(zip(job_fields, cell[0])) for cell in cells]
+    losses = np.full((len(cells), n_checks), np.nan)
+    clock = np.full((len(cells), n_checks), np.nan)
+    uplink = np.full((len(cells), n_checks), np.nan)
+    for r, cell in enumerate(cells):
+        losses[r, :len(cell[4])] = cell[4]
+        if cell[6] is not None:
+            clock[r, :len(cell[6])] = cell[6]
+        if cell[7] is not None:
+            uplink[r, :len(cell[7])] = cell[7]
+    def column(values, dtype=float): #None -> nan
+        return np.array([np.nan if v is None else v for v in values], dtype=dtype)
+    return dict(trial=np.full(len(cells), trial), alg=np.array([job['alg'] for job in jobs], dtype=str),
+                eps=column(job['eps'] for job in jobs), i=column((job['i'] for job in jobs), int),
+                stepsize=column(job['stepsize'] for job in jobs), L=column(job.get('L') for job in jobs),
+                rep=column((job['rep'] for job in jobs), int), seed=column((job['seed'] for job in jobs), np.int64),
+                converged=np.array([cell[1] == 'converged' for cell in cells]), excess=column(cell[2] for cell in cells),
+                test=column(cell[3] for cell in cells), seconds=column(cell[5] for cell in cells), losses=losses, clock=clock, uplink=uplink)
+
+def concat_tables(tables): #one table of the run tables of all trials
+    return {k: np.concatenate([table[k] for table in tables]) for k in tables[0]}
+
+def save_results(res, fname=None): #write the result dict of an experiment (with its 'runs' table) to fname (default: path + "results.npz")
+    fname = res['path'] + 'results.npz' if fname is None else fname
+    arrays, meta, by_eps = {}, {}, []
+    for k, v in res.items():
+        if k == 'runs':
+            arrays.update(('run_' + c, col) for c, col in v.items())
+        elif isinstance(v, dict) and k.endswith('_trials'): #eps -> array over trials
+            arrays['trial_' + k] = np.array([v[eps] for eps in res['epsilons']])
+            by_eps.append(k)
+        elif isinstance(v, np.ndarray):
+            arrays['trial_' + k] = v
+        else:
+            meta[k] = v
+    meta['by_eps'] = by_eps
+    with open(fname + '.tmp', 'wb') as f: #temp file, then rename: a crash never leaves a half-written table
+        np.savez(f, meta=np.array(json.dumps(meta, default=float)), **arrays)
+    os.replace(fname + '.tmp', fname)
+    print('wrote {:d} runs to {}'.format(len(res['runs']['trial']) if 'runs' in res else 0, fname))
+    return fname
+
+def load_results(fname): #the result dict saved by save_results (plot_results can draw it), with its runs table under 'runs'
+    with np.load(fname) as data:
+        res = json.loads(str(data['meta']))
+        by_eps = res.pop('by_eps')
+        res['runs'] = {k[len('run_'):]: data[k] for k in data.files if k.startswith('run_')}
+        for k in data.files:
+            if k.startswith('trial_'):
+                name = k[len('trial_'):]
+                res[name] = dict(zip(res['epsilons'], data[k])) if name in by_eps else data[k]
+    return res
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulated client-server runtime: each of the M clients is a long-lived worker process holding only its own shard of the
+train split. Every round the server writes w_start to a shared-memory broadcast buffer and sends each client of S the
+indices of its K local steps; the clients run their (noisy, clipped) local SGD steps concurrently and write their local
+iterates to their slots of a shared-memory update buffer, which the server averages. local_sgd and ACnoisy_local_sgd run
+their rounds on a runtime when given one (runtime=...), so round latency can be measured on real processes and cores.
+
+The server draws S and the minibatch indices exactly as local_sgd_round does (from the schedule, else from np.random), so a
+non-private run gives the same iterates as in-process. The privacy noise is drawn on the clients, each from its own stream
+(set per run by reseed, spawned like client_noise_streams): a noisy run matches the in-process run with those noise_rngs.
+"""
+
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from .noise import gaussian
+from .algorithms import local_steps, compress_updates
+
+
+def client_worker(m, features, labels, loss_gradient, broadcast_name, updates_name, M, conn):
+    #the loop of client m (a worker process): features [n_m x d], labels [n_m] are its shard
+    broadcast, updates = shared_memory.SharedMemory(broadcast_name), shared_memory.SharedMemory(updates_name)
+    d = features.shape[-1]
+    w_start = np.ndarray((d,), dtype=features.dtype, buffer=broadcast.buf)
+    W = np.ndarray((M, d), dtype=features.dtype, buffer=updates.buf)
+    noise_rng = None
+    try:
+        while True:
+            msg = conn.recv()
+            if msg is None: #shut down
+                break
+            if msg[0] == 'seed':
+                noise_rng = np.random.default_rng(msg[1])
+                continue
+            _, slots, idxs, K, stepsize, L, noise = msg #noise: None, or the std dev of the client's noise
+            start = time.perf_counter()
+            try:
+                for slot, row in zip(slots, idxs): #the client may have been sampled more than once
+                    Z = None if noise is None else gaussian(noise, d, size=(K, 1), rng=noise_rng, dtype=features.dtype) #the noise of its K steps
+                    W[slot] = local_steps(w_start, features[None, row], labels[None, row], K, stepsize, loss_gradient, L, Z)[0]
+            except Exception as e: #handed to the server, which raises it
+                conn.send(e)
+                continue
+            conn.send(time.perf_counter() - start)
+    finally:
+        del w_start, W
+        broadcast.close()
+        updates.close()
+
+class ClientRuntime:
+    #features [M x n_max x d], labels [M x n_max]: the train split (one row per client); ns: examples of each client (scalar or [M], default n_max)
+    #loss_gradient: module-level gradient oracle of the loss (see dpfl.losses); seed: the clients' noise streams until reseed
+    #the iterates are exchanged in the dtype of features (float32 features: a float32 run, see dpfl.precision)
+    def __init__(self, features, labels, loss_gradient, ns=None, seed=None):
+        self.M, n_max, self.d = features.shape
+        self.ns = np.broadcast_to(np.asarray(n_max if ns is None else ns, dtype=int), (self.M,))
+        self.dtype = features.dtype
+        self.broadcast = shared_memory.SharedMemory(create=True, size=self.dtype.itemsize*self.d)
+        self.updates = shared_memory.SharedMemory(create=True, size=self.dtype.itemsize*self.M*self.d)
+        self.w_start = np.ndarray((self.d,), dtype=self.dtype, buffer=self.broadcast.buf)
+        self.W = np.ndarray((self.M, self.d), dtype=self.dtype, buffer=self.updates.buf) #one slot per client of the round (|S| <= M)
+        self.conns, self.workers = [], []
+        for m in range(self.M):
+            conn, worker_conn = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=client_worker, daemon=True,
+                                             args=(m, features[m, :self.ns[m]], labels[m, :self.ns[m]], loss_gradient,
+                                                   self.broadcast.name, self.updates.name, self.M, worker_conn))
+            worker.start()
+            self.conns.append(conn)
+            self.workers.append(worker)
+        self.round_seconds = [] #wall time of each round (broadcast to averaged update)
+        self.client_seconds = [] #compute time of each client of each round
+        self.reseed(seed)
+
+    def reseed(self, seed): #start every client's noise stream afresh: client m's is child m of SeedSequence(seed), as in client_noise_streams
+        for conn, s in zip(self.conns, np.random.SeedSequence(seed).spawn(self.M)):
+            conn.send(('seed', s))
+
+    def local_round(self, w_start, S, idxs, K, stepsize, L=None, noise=None, compressor=None): #one round of local SGD on the clients S; returns the average of their local iterates
+        #idxs: [len(S) x K] indices of their steps (None: drawn here, like sample_eval); L: clip every local grad to norm L; noise: None, or the noise std dev (scalar or per client, see dpfl.privacy.noise_scale)
+        #compressor: the clients' updates go through it (see dpfl.compression; simulated on the server side of the shared buffer)
+        if len(S) == 0: #no client took part (Poisson sampling)
+            return w_start
+        S = np.asarray(S)
+        if idxs is None:
+            idxs = np.random.randint(0, self.ns[S][:, None], (len(S), K))
+        start = time.perf_counter()
+        self.w_start[:] = w_start
+        clients = list(dict.fromkeys(S.tolist())) #each client once, in order of its first slot
+        for m in clients:
+            slots = np.flatnonzero(S == m)
+            self.conns[m].send(('round', slots, idxs[slots], K, stepsize, L, noise if np.ndim(noise) == 0 else noise[m]))
+        seconds = [self.conns[m].recv() for m in clients]
+        for out in seconds:
+            if isinstance(out, Exception):
+                raise out
+        w = np.sum(compress_updates(self.W[:len(S)], w_start, S, compressor) / len(S), axis=0) #average SGD updates across the clients
+        self.round_seconds.append(time.perf_counter() - start)
+        self.client_seconds.append(seconds)
+        return w
+
+    def summary(self): #round latency of the rounds run so far
+        if not self.round_seconds:
+            return 'no rounds run'
+        rounds = np.array(self.round_seconds)
+        compute = np.array([max(seconds) for seconds in self.client_seconds])
+        return '{:d} rounds on {:d} clients: latency {:.2f} ms (p50 {:.2f}, p95 {:.2f}), slowest client {:.2f} ms, overhead {:.2f} ms'.format(
+            len(rounds), self.M, 1e3*rounds.mean(), 1e3*np.percentile(rounds, 50), 1e3*np.percentile(rounds, 95),
+            1e3*compute.mean(), 1e3*(rounds - compute).mean())
+
+    def close(self): #stop the workers and free the shared memory
+        for conn in self.conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in self.workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        del self.w_start, self.W
+        self.broadcast.close()
+        self.broadcast.unlink()
+        self.updates.close()
+        self.updates.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Round schedules: the clients S that take part in each round and the K minibatch (or local step) indices of each of
+them, pre-drawn in bulk from np.random.Generator streams a chunk of rounds at a time, so a schedule is cheap per round,
+reproducible from its seed and can be replayed (see replay).
+
+Clients are sampled 'without' replacement (Mavail distinct clients, the default), 'with' replacement, or by 'poisson'
+subsampling (each client independently with probability Mavail/M, so |S| varies and may be 0); the indices of each
+client's minibatch are drawn uniformly 'with' (the default) or 'without' replacement from its n_m examples.
+"""
+
+import numpy as np
+
+
+client_samplings = ('without', 'with', 'poisson')
+minibatch_samplings = ('with', 'without')
+sample_chunk_bytes = 2**22 #memory budget of the indices (or sort keys) drawn per chunk of rounds
+
+def draw_clients(rng, M, Mavail, n_rounds, client_sampling='without'): #the client subsets of n_rounds rounds: list of index arrays
+    if client_sampling == 'without':
+        return list(np.argsort(rng.random((n_rounds, M)), axis=1)[:, :Mavail])
+    if client_sampling == 'with':
+        return list(rng.integers(0, M, (n_rounds, Mavail)))
+    if client_sampling == 'poisson':
+        return [np.flatnonzero(row) for row in rng.random((n_rounds, M)) < Mavail/M]
+    raise ValueError('unknown client sampling {!r} (one of {})'.format(client_sampling, ', '.join(client_samplings)))
+
+def draw_minibatches(rng, ns, K, rows, minibatch_sampling='with'): #K example indices for each client in rows (a client may appear more than once): [len(rows) x K]
+    n_rows = ns[rows]
+    if minibatch_sampling == 'with':
+        return np.minimum((rng.random((len(rows), K)) * n_rows[:, None]).astype(int), n_rows[:, None] - 1)
+    if minibatch_sampling == 'without': #the K smallest of n_m random keys per row (keys past a client's n_m can never be picked)
+        keys = rng.random((len(rows), np.max(ns)))
+        keys[np.arange(keys.shape[1]) >= n_rows[:, None]] = 2
+        return np.argsort(keys, axis=1)[:, :K]
+    raise ValueError('unknown minibatch sampling {!r} (one of {})'.format(minibatch_sampling, ', '.join(minibatch_samplings)))
+
+def sample_rounds(M, Mavail, K, ns, R, seed=None, client_sampling='without', minibatch_sampling='with', chunk_rounds=None):
+    #generator of the schedule of R rounds: yields (S, idxs) with S the clients of the round and idxs [len(S) x K] the indices of their minibatches
+    #ns: number of examples of each client (scalar or [M]); seed: int or np.random.SeedSequence (None: fresh entropy)
+    #chunk_rounds: rounds drawn at once (default: as many as fit in sample_chunk_bytes); clients and minibatches come from two
+    #separate streams spawned from seed, so the schedule does not depend on chunk_rounds
+    seed = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    client_rng, minibatch_rng = (np.random.default_rng(s) for s in seed.spawn(2))
+    ns = np.broadcast_to(np.asarray(ns, dtype=int), (M,))
+    if minibatch_sampling == 'without' and K > np.min(ns):
+        raise ValueError('minibatch of K = {:d} without replacement from a client with only {:d} examples'.format(K, np.min(ns)))
+    if chunk_rounds is None:
+        per_round = 8*Mavail*(K if minibatch_sampling == 'with' else np.max(ns))
+        chunk_rounds = int(max(1, min(R, sample_chunk_bytes // per_round)))
+    for start in range(0, R, chunk_rounds):
+        clients = draw_clients(client_rng, M, Mavail, min(chunk_rounds, R - start), client_sampling)
+        idxs = draw_minibatches(minibatch_rng, ns, K, np.concatenate(clients).astype(int), minibatch_sampling)
+        for S, S_idxs in zip(clients, np.split(idxs, np.cumsum([len(S) for S in clients])[:-1])):
+            yield S, S_idxs
+
+def replay(schedule): #a schedule as a list, to run several algorithms (or stepsizes) on exactly the same rounds: iter(replay(...)) per run
+    return list(schedule)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reference solvers for the optimum (Fstar, wstar) of each trial's training objective,
+used to report excess risk F(w) - Fstar and upsilon^2.
+
+least_squares: closed form for the squared loss, from the sufficient statistics XtX, Xty
+newton: warm-started Newton's method with a backtracking line search, for smooth convex losses (e.g. logistic)
+"""
+
+import time
+import numpy as np
+from .tracing import null_tracer
+
+
+def least_squares(f_eval, XtX, Xty): #minimizer of the avg squared loss solves the normal equations XtX w = Xty; returns (Fstar, wstar)
+    from scipy import linalg
+    start = time.perf_counter()
+    try:
+        w = linalg.cho_solve(linalg.cho_factor(XtX), Xty)
+        method = 'Cholesky'
+    except linalg.LinAlgError: #XtX singular (e.g. collinear features): min-norm solution
+        w = np.linalg.lstsq(XtX, Xty, rcond=None)[0]
+        method = 'lstsq'
+    print("Least squares ({}) solved in {:.4f}s".format(method, time.perf_counter() - start))
+    return f_eval(w), w
+
+
+def newton(w0, f_eval, grad_eval, hessian_eval, max_iter=100, tol=1e-6, refactor_every=4, armijo=1e-4, backtrack=0.5, tracer=None):
+    #Newton's method started at w0 (e.g. the previous trial's wstar, which is close when the data barely change between trials); returns (Fstar, wstar, stats)
+    #with stats = dict(status ('converged', 'precision limit' or 'max_iter'), iterations, factorizations (of the Hessian), seconds)
+    #The Cholesky factor of the Hessian is reused for up to refactor_every iterations: near the optimum the Hessian barely moves,
+    #and a step taken with a stale factor is still a descent direction that the line search keeps honest. Stops when the
+    #Newton decrement sqrt(g^T H^{-1} g) <= tol. tracer: a dpfl.tracing.Tracer timing each iteration's phases (None: no timing)
+    from scipy import linalg
+    start = time.perf_counter()
+    tracer = null_tracer if tracer is None else tracer
+    w = np.array(w0, dtype=float)
+    with tracer.phase('loss'):
+        f = f_eval(w)
+    factor, age, n_factorizations = None, refactor_every, 0
+    def stats(status, iterations):
+        return dict(status=status, iterations=iterations, factorizations=n_factorizations, seconds=time.perf_counter() - start)
+    for t in range(max_iter):
+        tracer.round = t
+        with tracer.phase('gradient'):
+            gradient = grad_eval(w)
+        if age >= refactor_every:
+            with tracer.phase('hessian'):
+                factor = linalg.cho_factor(hessian_eval(w))
+            age, n_factorizations = 0, n_factorizations + 1
+        with tracer.phase('solve'):
+            update_direction = linalg.cho_solve(factor, gradient)
+        decrement_sq = np.dot(gradient, update_direction)
+        if np.sqrt(max(decrement_sq, 0)) <= tol:
+            print("Newton's method converged after {:d} iterations ({:d} Hessian factorizations, {:.3f}s)".format(t + 1, n_factorizations, time.perf_counter() - start))
+            return f, w, stats('converged', t + 1)
+        stepsize = 1.
+        while True: #backtracking (Armijo) line search
+            with tracer.phase('loss'):
+                f_new = f_eval(w - stepsize * update_direction)
+            if f_new <= f - armijo * stepsize * decrement_sq or stepsize < 1e-10:
+                break
+            stepsize *= backtrack
+        if stepsize < 1e-10: #no progress along this direction
+            if age == 0: #even with a fresh Hessian: at the limit of numerical precision, i.e. converged
+                print("Newton's method converged (precision limit) after {:d} iterations ({:d} Hessian factorizations, {:.3f}s)".format(t + 1, n_factorizations, time.perf_counter() - start))
+                return f, w, stats('precision limit', t + 1)
+            age = refactor_every #stale factor: refactor and retry from the same point
+            continue
+        w -= stepsize * update_direction
+        f = f_new
+        age += 1
+    print("Warning: Newton's method failed to converge ({:d} Hessian factorizations, {:.3f}s)".format(n_factorizations, time.perf_counter() - start))
+    return f, w, stats('max_iter', max_iter)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parallel hyperparameter sweep: every (algorithm, eps, grid point, rep) cell of a trial is an independent job with its own seed,
+so the jobs can run on a process pool in any order and still give the same results as running them one after the other.
+A job is a tuple (alg, eps, grid index, ..., seed); each experiment (dpfl.mnist, dpfl.insurance) builds its own jobs and
+provides the worker initializer and run_cell that know how to run them. In sweep mode (stacked=True) the whole grid of a
+minibatch algorithm at one eps is a single stacked job (grid index None, see dpfl.algorithms.minibatch_sgd_sweep) whose
+run_cell returns a list with one cell per (grid point, rep). With a checkpoint file (see dpfl.checkpoint) every job is
+saved as soon as it finishes and jobs already in the file are not run again.
+"""
+
+import multiprocessing
+from collections import defaultdict
+from functools import partial
+import numpy as np
+from .sampling import sample_rounds
+from .checkpoint import job_key, load_cells, append_cells
+from .tuning import successive_halving
+from .aggregation import latency_model
+from .compression import Compressor, compressions
+from .tracing import Tracer, job_trace_file
+
+
+sweep_algs = ['MB', 'local', 'noisyMB', 'noisyloc']
+
+#The sweep options of every experiment (dpfl.mnist, dpfl.insurance; the dpfl.cli flags of the same names), checked by check_options:
+#n_workers: number of processes for the hyperparameter sweep (1 = run everything in this process; None = one per cpu)
+#stacked: sweep mode, run the whole grid and all reps of (noisy) MB SGD at each eps as one stacked run (see dpfl.algorithms.minibatch_sgd_sweep)
+#client_sampling, minibatch_sampling: run each (non-stacked) job on a pre-drawn round schedule sampled this way (see dpfl.sampling.sample_rounds)
+#checkpoint_dir: save every finished sweep job under this folder, and skip the ones saved by an earlier run of the same configuration (see dpfl.checkpoint)
+#tuner: 'grid' runs the whole grid for all R rounds, 'halving' prunes it by successive halving with factor eta (see dpfl.tuning)
+#averaging: iterate averaging of every run, 'window' (last 8 iterates), 'ema' or 'polyak' (see dpfl.averaging)
+#federated: run the local SGD rounds on one worker process per client (see dpfl.runtime); the sweep then runs in this process
+#aggregation: run local SGD with 'sync', 'first_k' (first_k clients) or 'stale' (max_staleness) aggregation on a simulated clock, a fraction
+#stragglers of the clients being slowdown times slower (see dpfl.aggregation); None: plain local SGD, no clock
+#target_excess: with aggregation, also report the simulated time for the selected (noisy) local SGD runs to reach train loss
+#Fstar + target_excess, averaged over the reps (see dpfl.aggregation.sweep_time_to_loss); None: the loss they end at
+#accountant: privacy accounting that sets K and the noise scale, 'moments' or 'advanced' (see dpfl.privacy)
+#trace_dir: time the phases of every (non-stacked) run and write one Chrome trace per trial to this folder (see dpfl.tracing)
+#dtype: compute precision of the sweep, 'float64' or 'float32' (the train data is cast after Fstar is computed; see dpfl.precision)
+#compression: send the clients' updates (local SGD) or grads (MB SGD) of every (non-stacked, synchronous) run through 'topk',
+#'quantize' or 'rotation' compression, of compression_ratio of the coordinates, and record the uplink bytes (see dpfl.compression)
+#clipping: what (noisy) MB SGD clips to norm L (see dpfl.algorithms.clippings), one of the experiment's experiment_clippings
+
+def check_options(experiment_clippings, federated=False, aggregation=None, clipping=None, compression=None, stacked=False): #raise ValueError on sweep options an experiment cannot run
+    if federated and aggregation is not None:
+        raise ValueError('the client runtime (federated) only runs synchronous rounds: use one of federated, aggregation')
+    if clipping not in experiment_clippings:
+        raise ValueError('unsupported clipping {!r} (one of {})'.format(clipping, ', '.join(experiment_clippings)))
+    if compression is not None and compression not in compressions:
+        raise ValueError('unknown compression {!r} (one of {})'.format(compression, ', '.join(compressions)))
+    if compression is not None and aggregation is not None:
+        raise ValueError('compression only runs on synchronous rounds: use one of compression, aggregation')
+    if compression is not None and stacked:
+        raise ValueError('compression only runs on non-stacked runs (stacked MB runs would stay dense): use one of compression, stacked')
+
+def cell_seed(base_seed, *keys): #deterministic seed of one sweep job, derived from the experiment's base seed and the job's keys (trial, a, e, i, rep; or trial, a, e for a stacked job)
+    return int(np.random.SeedSequence([base_seed, *keys]).generate_state(1)[0])
+
+def cell_schedule(trial_data, ns, seed): #a job's round schedule (see dpfl.sampling) if the experiment sets client_sampling or minibatch_sampling, else None (rounds drawn from np.random)
+    t = trial_data
+    if t.get('client_sampling') is None and t.get('minibatch_sampling') is None:
+        return None
+    return sample_rounds(t['M'], t['Mavail'], t['K'], ns, t['R'], seed, t['client_sampling'] or 'without', t['minibatch_sampling'] or 'with')
+
+def job_setup(trial_data, job, ns): #seed np.random for a non-stacked job (job[-1] is its seed) and return what its run needs from the sweep options:
+    #(client runtime, latency model, tracer, compressor, round schedule), each None when the option is off; ns: examples of each client
+    t, seed = trial_data, job[-1]
+    np.random.seed(seed)
+    runtime = t.get('runtime')
+    if runtime is not None: #the clients' noise streams of this job
+        runtime.reseed(seed)
+    latency = None if t.get('aggregation') is None else latency_model(t['M'], stragglers=t['stragglers'], slowdown=t['slowdown'], seed=seed)
+    tracer = None if t.get('trace_dir') is None else Tracer(' '.join(map(str, job[:-1])))
+    compressor = None if t.get('compression') is None else Compressor(t['compression'], t['x_len'], t['M'], t['compression_ratio'], seed=seed)
+    return runtime, latency, tracer, compressor, cell_schedule(t, ns, seed)
+
+def job_outputs(trial_data, job, tracer, compressor, losses): #save the trace of a job run with job_setup's tracer, and return its uplink bytes at each loss check (None: not compressed)
+    t = trial_data
+    if tracer is not None:
+        tracer.save(job_trace_file(t['trace_dir'], job[-1], t.get('rounds') or t['R']))
+    return None if compressor is None else compressor.uplink(t['loss_freq'])[:len(losses)].tolist()
+
+def run_indexed(run_cell, indexed_job): #(index, job) -> (index, run_cell(job)), so that jobs finishing out of order can be put back in order
+    j, job = indexed_job
+    return j, run_cell(job)
+
+def run_sweep(jobs, trial_data, n_workers, init_worker, run_cell, checkpoint=None): #run jobs on n_workers processes (n_workers=1: in this process); results come back in job order
+    #init_worker(trial_data) sets up a process for the trial, run_cell(job) runs one job; both must be module-level functions so workers can import them
+    #checkpoint: file the finished jobs are appended to (see dpfl.checkpoint); jobs already in it are taken from it instead of run
+    done = load_cells(checkpoint) if checkpoint is not None else {}
+    outs = [done.get(job_key(job)) for job in jobs]
+    todo = [(j, job) for j, job in enumerate(jobs) if outs[j] is None]
+    if done:
+        print('Resuming from {}: {:d} of {:d} sweep jobs already done'.format(checkpoint, len(jobs) - len(todo), len(jobs)))
+    def finished(j, out):
+        outs[j] = out
+        if checkpoint is not None:
+            append_cells(checkpoint, jobs[j], out)
+    if todo and n_workers == 1:
+        init_worker(trial_data)
+        state = np.random.get_state() #jobs reseed the global RNG; restore it so later trials split the data as with a pool
+        for j, job in todo:
+            finished(j, run_cell(job))
+        np.random.set_state(state)
+    elif todo:
+        with multiprocessing.Pool(n_workers, initializer=init_worker, initargs=(trial_data,)) as pool:
+            for j, out in pool.imap_unordered(partial(run_indexed, run_cell), todo, chunksize=1): #saved as they finish
+                finished(j, out)
+    cells = []
+    for out in outs: #a stacked job gives a list of cells
+        cells.extend(out if isinstance(out, list) else [out])
+    return cells
+
+def tune_sweep(jobs, trial_data, n_workers, init_worker, run_cell, checkpoint=None, tuner='grid', eta=3): #the cells of a trial's sweep
+    #tuner: 'grid' runs every job for all R rounds, 'halving' prunes the grid by successive halving (see dpfl.tuning) with factor eta
+    #checkpoint: None, or a function giving the checkpoint file of the full runs (checkpoint(None)) and of a rung of fewer rounds (checkpoint(rounds))
+    R = trial_data['R']
+    def run_jobs(jobs, rounds=R):
+        return run_sweep(jobs, dict(trial_data, rounds=rounds), n_workers, init_worker, run_cell,
+                         None if checkpoint is None else checkpoint(rounds if rounds < R else None))
+    if tuner == 'grid':
+        return run_jobs(jobs)
+    if tuner == 'halving':
+        return successive_halving(jobs, run_jobs, R, trial_data['loss_freq'], eta)
+    raise ValueError('unknown tuner {!r} (grid or halving)'.format(tuner))
+
+def reduce_sweep(cells, n_configs, n_reps, penalty): #average excess risks and test errors over reps: returns 2 dicts (alg, eps) -> array over the grid; diverged runs add penalty
+    #grid points without cells (pruned by successive halving) get inf
+    results = defaultdict(lambda: np.zeros(n_configs))
+    tests = defaultdict(lambda: np.zeros(n_configs))
+    ran = defaultdict(lambda: np.zeros(n_configs, dtype=bool))
+    for job, success, excess, test, *_ in cells:
+        alg, eps, i = job[:3]
+        ran[alg, eps][i] = True
+        if success == 'converged':
+            results[alg, eps][i] += excess / n_reps #average excess risk val over the n_reps trials
+            tests[alg, eps][i] += test / n_reps
+        else:
+            results[alg, eps][i] += penalty
+            tests[alg, eps][i] += penalty
+    for key, mask in ran.items():
+        results[key][~mask] = tests[key][~mask] = np.inf
+    return results, tests
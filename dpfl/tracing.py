@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-phase instrumentation of the training loops: the algorithms (and newton) take a tracer and time each phase of each
+round in it, with tracer.phase(name) as a context manager:
+ - 'sampling': drawing the round's clients (and, for local SGD, their minibatches)
+ - 'gradient': gradient evaluations; 'clipping': clipping them; 'noise': drawing the privacy noise
+ - 'aggregation': combining the clients' grads or local iterates into the next iterate
+ - 'loss': loss evaluations (every loss_freq rounds; the line search of newton)
+ - 'compression': encoding and decoding the clients' messages (see dpfl.compression)
+ - 'clients': whole local rounds run on client processes (see dpfl.runtime); newton also has 'hessian' and 'solve'
+The default null_tracer does nothing. A Tracer keeps every span (phase, round, start, duration); summary() tabulates them
+and save() writes a Chrome trace (chrome://tracing, Perfetto) JSON; the traces of sweep jobs run in different processes are
+merged with merge_traces.
+"""
+
+import json
+import os
+import time
+from collections import defaultdict
+
+
+class Span: #the context manager of one timed phase
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer, self.name = tracer, name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.spans.append((self.name, self.tracer.round, self.start, time.perf_counter() - self.start))
+
+class Tracer:
+    def __init__(self, label=''): #label: what is traced (e.g. the sweep job), the category of its spans in the Chrome trace
+        self.label = label
+        self.round = None #set by the training loop; spans are tagged with it
+        self.spans = [] #(phase, round, start (perf_counter), seconds)
+        self.pid = os.getpid()
+        self.origin = time.time() - time.perf_counter() #perf_counter -> wall clock, so traces of different processes line up
+
+    def phase(self, name):
+        return Span(self, name)
+
+    def totals(self): #{phase: (calls, seconds)}, phases in order of first use
+        totals = {}
+        for name, r, start, seconds in self.spans:
+            calls, total = totals.get(name, (0, 0.))
+            totals[name] = (calls + 1, total + seconds)
+        return totals
+
+    def per_round(self): #{phase: {round: seconds}}
+        rounds = defaultdict(lambda: defaultdict(float))
+        for name, r, start, seconds in self.spans:
+            rounds[name][r] += seconds
+        return {name: dict(by_round) for name, by_round in rounds.items()}
+
+    def summary(self): #table of the time spent in each phase
+        totals = self.totals()
+        traced = sum(seconds for calls, seconds in totals.values())
+        n_rounds = len({r for name, r, start, seconds in self.spans if r is not None})
+        lines = ['{:<12s} {:>9s} {:>10s} {:>7s} {:>12s}'.format('phase', 'calls', 'seconds', 'share', 'ms/round')]
+        for name, (calls, seconds) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            lines.append('{:<12s} {:>9d} {:>10.3f} {:>6.1f}% {:>12.4f}'.format(name, calls, seconds, 100*seconds/traced if traced else 0., 1e3*seconds/max(1, n_rounds)))
+        lines.append('{:<12s} {:>9d} {:>10.3f} ({:d} rounds)'.format('total', len(self.spans), traced, n_rounds))
+        return '\n'.join(lines)
+
+    def events(self): #the spans as Chrome trace complete events (times in microseconds)
+        return [dict(name=name, cat=self.label, ph='X', ts=1e6*(self.origin + start), dur=1e6*seconds, pid=self.pid, tid=0, args=dict(round=r))
+                for name, r, start, seconds in self.spans]
+
+    def save(self, fname): #write the Chrome trace JSON
+        with open(fname + '.tmp', 'w') as f:
+            json.dump(dict(traceEvents=self.events(), displayTimeUnit='ms'), f)
+        os.replace(fname + '.tmp', fname)
+        return fname
+
+class NullTracer: #the default: no timing at all
+    round = None
+
+    def phase(self, name):
+        return null_span
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+null_span = NullSpan()
+null_tracer = NullTracer()
+
+def merge_traces(fnames, out=None): #a Tracer with the spans of the saved traces fnames (for its summary); also written to out if given
+    merged = Tracer('merged')
+    events = []
+    for fname in fnames:
+        with open(fname) as f:
+            events.extend(json.load(f)['traceEvents'])
+    merged.origin = 0.
+    merged.spans = [(e['name'], None if e['args'].get('round') is None else (e['cat'], e['pid'], e['args']['round']), 1e-6*e['ts'], 1e-6*e['dur'])
+                    for e in events] #rounds of different jobs are told apart by their label and process
+    if out is not None:
+        with open(out + '.tmp', 'w') as f:
+            json.dump(dict(traceEvents=events, displayTimeUnit='ms'), f)
+        os.replace(out + '.tmp', out)
+    return merged
+
+def job_trace_file(trace_dir, seed, rounds): #trace file of one sweep job (of a successive halving rung of rounds rounds)
+    return os.path.join(trace_dir, 'job{:d}_rounds{:d}.json'.format(seed, rounds))
+
+def merge_job_traces(trace_dir, jobs, out): #merge the traces of the sweep jobs that ran (all their rungs) into out and delete them; returns the merged Tracer
+    fnames = [os.path.join(trace_dir, fname) for fname in sorted(os.listdir(trace_dir))
+              if any(fname.startswith('job{:d}_rounds'.format(job[-1])) for job in jobs)]
+    merged = merge_traces(fnames, out)
+    for fname in fnames:
+        os.remove(fname)
+    return merged
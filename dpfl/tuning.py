@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Successive halving over the tuning grid of a sweep: every grid point of each (algorithm, eps) runs (all its reps) for a
+few rounds, only the best 1/eta of them (by the mean over reps of the loss at their last loss check) run eta times as
+many rounds, and so on until the survivors run all R rounds. A run stopped after r rounds is exactly the first r rounds
+of the full run (same seed, noise calibrated for R), so the survivors' results are the ones the full grid sweep gets;
+pruned grid points are never selected. Stacked jobs (sweep mode) are not pruned.
+"""
+
+import math
+from collections import defaultdict
+import numpy as np
+
+
+def rung_rounds(R, loss_freq, eta=3): #increasing round budgets of the rungs, each about eta times the previous one and a multiple of loss_freq, ending at R
+    rungs = [R]
+    while rungs[0] > loss_freq:
+        rounds = max(loss_freq, math.ceil(rungs[0] / eta / loss_freq) * loss_freq)
+        if rounds >= rungs[0]:
+            break
+        rungs.insert(0, rounds)
+    return rungs
+
+def grid_scores(cells): #{(alg, eps, grid index): mean over reps of the last loss check (inf if a rep diverged)}
+    losses = defaultdict(list)
+    for job, success, excess, test, l, *_ in cells:
+        losses[job[:3]].append(l[-1] if success == 'converged' and len(l) else np.inf)
+    return {point: np.nan_to_num(np.mean(l), nan=np.inf) for point, l in losses.items()}
+
+def successive_halving(jobs, run_jobs, R, loss_freq, eta=3):
+    #jobs: the sweep's jobs (alg, eps, grid index, ..., seed); run_jobs(jobs, rounds) runs them for their first rounds rounds and returns their cells
+    #returns the cells of the jobs that ran all R rounds, in job order
+    rungs = rung_rounds(R, loss_freq, eta)
+    live = {job[:3] for job in jobs if job[2] is not None}
+    cost = 0
+    for rounds in rungs[:-1]:
+        rung_jobs = [job for job in jobs if job[2] is not None and job[:3] in live]
+        cost += len(rung_jobs) * rounds
+        by_grid = defaultdict(list) #(alg, eps) -> [(score, grid index)]
+        for (alg, eps, i), score in grid_scores(run_jobs(rung_jobs, rounds)).items():
+            by_grid[alg, eps].append((score, i))
+        live = set()
+        for (alg, eps), points in by_grid.items():
+            points.sort(key=lambda point: point[0]) #stable: ties keep the smaller grid index
+            live.update((alg, eps, i) for score, i in points[:max(1, len(points) // eta)])
+        print('Successive halving: {:d} grid points go on from {:d} to {:d} rounds'.format(len(live), rounds, rungs[rungs.index(rounds) + 1]))
+    final_jobs = [job for job in jobs if job[2] is None or job[:3] in live]
+    cost += sum(R for job in final_jobs if job[2] is not None)
+    print('Successive halving: {:d} job rounds instead of {:d}'.format(cost, R * sum(job[2] is not None for job in jobs)))
+    return run_jobs(final_jobs, R)
@@ -0,0 +1,51 @@
+"""
+The 'stale' (asynchronous) aggregation of dpfl.aggregation runs the local jobs of exactly R synchronous rounds, with or
+without a pre-drawn schedule (see dpfl.sampling).
+"""
+
+import numpy as np
+import pytest
+from dpfl.aggregation import async_local_sgd, latency_model, sweep_time_to_loss
+from dpfl.losses import squared_loss_gradient, F_eval
+from dpfl.sampling import sample_rounds
+
+
+M, Mavail, K, R, loss_freq, n, d = 8, 3, 4, 10, 5, 20, 4
+
+@pytest.fixture
+def problem():
+    rng = np.random.default_rng(7)
+    X = rng.normal(size=(M, n, d))
+    Y = X @ np.ones(d) + .1*rng.normal(size=(M, n))
+    jobs = []
+    def f_eval(w):
+        return F_eval(w, X.reshape(-1, d), Y.ravel())
+    def sample_eval(minibatch_size, m, idxs=None):
+        m = np.asarray(m)
+        jobs.extend(m.tolist())
+        if idxs is None:
+            idxs = np.random.randint(0, n, m.shape + (minibatch_size,))
+        return X[m[..., None], idxs], Y[m[..., None], idxs]
+    return f_eval, sample_eval, jobs
+
+@pytest.mark.parametrize('scheduled', [False, True])
+def test_stale_runs_the_jobs_of_R_rounds(problem, scheduled):
+    f_eval, sample_eval, jobs = problem
+    np.random.seed(0)
+    schedule = sample_rounds(M, Mavail, K, np.full(M, n), R, seed=3) if scheduled else None
+    iterates, losses, status, clock = async_local_sgd(d, M, Mavail, K, R, .01, loss_freq, f_eval, sample_eval, squared_loss_gradient,
+                                                      latency_model(M, seed=4), aggregation='stale', schedule=schedule)
+    assert len(losses) == len(clock) == R // loss_freq
+    assert np.all(np.isfinite(losses)) and np.all(np.diff(clock) >= 0)
+    assert len(jobs) == R * Mavail
+    if scheduled: #the clients of the schedule's rounds, in order
+        np.testing.assert_array_equal(jobs, np.concatenate([S for S, idxs in sample_rounds(M, Mavail, K, np.full(M, n), R, seed=3)]))
+
+def test_time_to_loss_averages_reps_of_different_lengths():
+    cells = [(('local', None, 0, .1, 0, 1), 'converged', .5, .1, [3., 2., 1.5], 0., [1., 2., 3.], None),
+             (('local', None, 0, .1, 1, 2), 'diverged', None, None, [3., 200.], 0., [2., 4.], None), #stopped after 2 checks
+             (('local', None, 1, .2, 0, 3), 'converged', .2, .1, [1., 1., 1.], 0., [1., 1., 1.], None)] #another grid point
+    assert sweep_time_to_loss(cells, 'local', None, 0, 1., 1.) == 3. #mean excess [2, 100, .5] at mean clock [1.5, 3, 3]
+    assert sweep_time_to_loss(cells, 'local', None, 0, 1.) == 3. #to the excess they end at
+    assert sweep_time_to_loss(cells, 'local', None, 0, 1., .1) == np.inf
+    assert np.isnan(sweep_time_to_loss(cells, 'noisyloc', 1.5, 0, 1.))
@@ -0,0 +1,23 @@
+"""
+Diverging runs of dpfl.algorithms: a nan loss ends a run as diverged, and clipping stays finite when the grads' norms
+overflow float32.
+"""
+
+import warnings
+import numpy as np
+from dpfl.algorithms import run_rounds, clip_factors, clip_rows
+
+
+def test_nan_loss_counts_as_diverged():
+    iterates, losses, status = run_rounds(lambda w: w + np.nan, 3, 10, 2, lambda w: float(np.sum(w)))
+    assert status == 'diverged' and len(losses) == 1
+
+def test_clip_factors_of_overflowing_rows():
+    G = np.array([[3., 4.], [3e30, 4e30], [1., 0.]], dtype=np.float32) #the second row's squared norm overflows float32
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        c = clip_factors(G, 1.)
+        clipped = clip_rows(G, 1.)
+    assert c.dtype == np.float32 and clipped.dtype == np.float32
+    np.testing.assert_allclose(c, [.2, 2e-31, 1.], rtol=1e-6)
+    np.testing.assert_allclose(np.linalg.norm(clipped.astype(float), axis=1), [1., 1., 1.], rtol=1e-6)
@@ -0,0 +1,22 @@
+"""
+The error feedback of 'topk' compression (dpfl.compression) loses nothing: what the server decodes plus what the
+clients keep for later is what they sent, also when a round samples a client more than once.
+"""
+
+import numpy as np
+from dpfl.compression import Compressor
+
+
+def test_topk_error_feedback_keeps_every_update():
+    rng = np.random.default_rng(5)
+    M, d = 6, 10
+    compressor = Compressor('topk', d, M, ratio=.2)
+    for S in (np.array([0, 3, 4]), np.array([1, 1, 2, 1]), np.array([3, 0, 3])): #clients sampled with replacement repeat
+        U = rng.normal(size=(len(S), d))
+        before = np.zeros((M, d)) if compressor.residual is None else compressor.residual.copy()
+        decoded = compressor.compress(U, S)
+        assert np.all(np.count_nonzero(decoded, axis=1) <= compressor.k)
+        np.testing.assert_allclose(decoded.sum(axis=0) + compressor.residual.sum(axis=0) - before.sum(axis=0), U.sum(axis=0), atol=1e-12)
+        for m in range(M): #every client's memory is what its own messages did not send
+            rows = S == m
+            np.testing.assert_allclose(compressor.residual[m], before[m] + U[rows].sum(axis=0) - decoded[rows].sum(axis=0) if rows.any() else before[m], atol=1e-12)
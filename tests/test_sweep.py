@@ -0,0 +1,71 @@
+"""
+Reproducibility guarantees of the sweep: a resumed checkpointed sweep, the survivors of successive halving and the
+pre-drawn round schedules give exactly the results of an uninterrupted grid sweep (dpfl.checkpoint, dpfl.tuning,
+dpfl.sampling). The MNIST experiment runs on a small synthetic data set of the same shape.
+"""
+
+import glob
+import os
+import numpy as np
+import pytest
+from dpfl import mnist
+from dpfl.sampling import sample_rounds, client_samplings, minibatch_samplings
+
+
+def synthetic_MNIST2(p, dim, path, seed=None): #load_MNIST2 on random data: 25 clients, 48 train / 12 test examples each
+    train_labels = (np.random.random((25, 48)) < .5).astype(float)
+    test_labels = (np.random.random((25, 12)) < .5).astype(float)
+    train_features = np.random.normal(size=(25, 48, dim)) + .3*train_labels[..., None]
+    test_features = np.random.normal(size=(25, 12, dim)) + .3*test_labels[..., None]
+    return train_features, train_labels, test_features, test_labels, 30
+
+@pytest.fixture
+def experiment(monkeypatch):
+    monkeypatch.setattr(mnist, 'load_MNIST2', synthetic_MNIST2)
+    def run(**kwargs):
+        settings = dict(num_trials=1, n_reps=2, n_stepsizes=3, epsilons=[1.5], R=10, loss_freq=5, dim=5, n_workers=1)
+        return mnist.experiment(**dict(settings, **kwargs))['runs']
+    return run
+
+def same_runs(runs, expected, rows=None): #the runs table equals expected (in its rows with the seeds of runs), up to wall times
+    rows = np.arange(len(expected['seed'])) if rows is None else rows
+    for column, values in runs.items():
+        if column != 'seconds':
+            np.testing.assert_array_equal(values, expected[column][rows], err_msg=column)
+
+def test_resume_from_truncated_checkpoint(experiment, tmp_path):
+    full = experiment(checkpoint_dir=str(tmp_path))
+    fname, = glob.glob(os.path.join(str(tmp_path), '*', 'trial000.jsonl'))
+    with open(fname, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    with open(fname, 'wb') as f: #an interrupted sweep: half of its jobs saved, then a torn line
+        f.write(b''.join(lines[:len(lines)//2]) + lines[len(lines)//2][:20])
+    resumed = experiment(checkpoint_dir=str(tmp_path))
+    same_runs(resumed, full)
+    with open(fname, 'rb') as f:
+        assert len(f.read().splitlines()) == len(lines)
+
+def test_halving_survivors_match_grid(experiment):
+    grid = experiment()
+    halving = experiment(tuner='halving')
+    assert 0 < len(halving['seed']) < len(grid['seed'])
+    rows = np.array([np.flatnonzero(grid['seed'] == seed)[0] for seed in halving['seed']])
+    same_runs(halving, grid, rows)
+
+@pytest.mark.parametrize('client_sampling', client_samplings)
+@pytest.mark.parametrize('minibatch_sampling', minibatch_samplings)
+def test_schedule_does_not_depend_on_chunk_size(client_sampling, minibatch_sampling):
+    ns = np.array([9, 12, 10, 15, 11, 9])
+    def schedule(chunk_rounds):
+        return list(sample_rounds(6, 3, 4, ns, 7, 2021, client_sampling, minibatch_sampling, chunk_rounds))
+    default = schedule(None)
+    for chunk_rounds in (1, 3, 7):
+        chunked = schedule(chunk_rounds)
+        assert len(chunked) == len(default)
+        for (S, idxs), (S0, idxs0) in zip(chunked, default):
+            np.testing.assert_array_equal(S, S0)
+            np.testing.assert_array_equal(idxs, idxs0)
+
+def test_stacked_compression_is_rejected(experiment):
+    with pytest.raises(ValueError, match='stacked'):
+        experiment(stacked=True, compression='topk')